@@ -10,7 +10,7 @@ Uses a local Ollama instance. No API key required.
 import json
 import logging
 import os
-from typing import Optional
+from typing import Iterator, Optional
 
 import requests
 
@@ -120,8 +120,11 @@ def _build_enriched_prompt(
     rules: list[dict],
 ) -> str:
     """Build a rich categorisation prompt with Indian context and few-shot examples."""
-    cat_list = ", ".join(categories)
+    return _build_batch_prompt(batch, ", ".join(categories), _build_examples_block(examples, rules))
+
 
+def _build_examples_block(examples: list[dict], rules: list[dict]) -> str:
+    """Format the few-shot section; it is the same for every batch in a run."""
     # Few-shot examples from user's own history + rules
     example_lines = []
     seen_examples = set()
@@ -142,8 +145,11 @@ def _build_enriched_prompt(
             )
             seen_examples.add(key)
 
-    examples_block = "\n".join(example_lines) if example_lines else "  (no examples yet)"
+    return "\n".join(example_lines) if example_lines else "  (no examples yet)"
+
 
+def _build_batch_prompt(batch: list[dict], cat_list: str, examples_block: str) -> str:
+    """Fill the prompt template for one batch of transactions."""
     # Transaction lines with metadata
     txn_lines = []
     for i, t in enumerate(batch):
@@ -203,40 +209,35 @@ Example output: {{"0": "Food", "1": "Shopping", "2": "Rent"}}
 # Main categorisation flow (3-layer)
 # ---------------------------------------------------------------------------
 
-def categorize_transactions(
+def categorize_transactions_chunked(
     transactions: list[dict],
     categories: list[str],
     model_name: Optional[str] = None,
-) -> dict[int, str]:
-    """Categorise transactions using a 3-layer approach:
-
-    Layer 1: Apply keyword rules from user corrections (instant, exact).
-    Layer 2: LLM with enriched context for remaining transactions.
-
-    Args:
-        transactions: list of dicts with 'id', 'description', and optionally
-                      'amount', 'type', 'date', 'email_body'.
-        categories: allowed category names.
-
-    Returns:
-        dict mapping transaction id -> category string.
+) -> Iterator[tuple[int, int, dict[int, str]]]:
+    """Categorise transactions incrementally, one LLM batch at a time.
+
+    Same 3-layer flow as :func:`categorize_transactions`, but yields
+    ``(done, total, partial)`` after the rule pass and after every LLM
+    batch so callers can show progress and keep the work finished so far
+    if a later batch fails.  ``partial`` only holds the ids resolved in
+    that step.
     """
+    total = len(transactions)
     if not transactions:
-        return {}
-
-    all_results: dict[int, str] = {}
+        return
 
     # --- Layer 1: Rule-based matching ---
     rule_matches = apply_rules_to_transactions(transactions)
     if rule_matches:
-        all_results.update(rule_matches)
-        logger.info("Layer 1 (rules): matched %d / %d transactions", len(rule_matches), len(transactions))
+        logger.info("Layer 1 (rules): matched %d / %d transactions", len(rule_matches), total)
+    done = len(rule_matches)
+    yield done, total, dict(rule_matches)
 
     # --- Layer 2: LLM for remaining ---
-    remaining = [t for t in transactions if t["id"] not in all_results]
+    remaining = [t for t in transactions if t["id"] not in rule_matches]
 
     if not remaining:
-        return all_results
+        return
 
     if not _check_ollama_running():
         raise RuntimeError(
@@ -248,15 +249,20 @@ def categorize_transactions(
     if not any(model in m for m in available) and available:
         logger.info("Model '%s' not found. Available: %s", model, available)
 
-    # Fetch few-shot examples and rules for the prompt
-    examples = get_categorized_examples(limit=30)
-    rules = get_all_rules()
+    # Fetch few-shot examples and rules once; only the transaction lines
+    # differ between batches
+    cat_list = ", ".join(categories)
+    examples_block = _build_examples_block(
+        get_categorized_examples(limit=30), get_all_rules()
+    )
 
+    llm_count = 0
     for start in range(0, len(remaining), BATCH_SIZE):
         batch = remaining[start : start + BATCH_SIZE]
         ids = [t["id"] for t in batch]
+        partial: dict[int, str] = {}
 
-        prompt = _build_enriched_prompt(batch, categories, examples, rules)
+        prompt = _build_batch_prompt(batch, cat_list, examples_block)
         response_text = _call_ollama(prompt, model)
         mapping = _parse_json_response(response_text)
 
@@ -268,16 +274,45 @@ def categorize_transactions(
                     continue
                 if 0 <= idx < len(batch):
                     if category in categories:
-                        all_results[ids[idx]] = category
+                        partial[ids[idx]] = category
                     else:
-                        all_results[ids[idx]] = "Other"
+                        partial[ids[idx]] = "Other"
         else:
             logger.warning("No valid mapping for batch starting at %d", start)
 
+        llm_count += len(partial)
+        done += len(batch)
+        yield done, total, partial
+
     logger.info(
         "Categorization complete: %d rule-matched, %d LLM-categorized, %d total",
-        len(rule_matches), len(all_results) - len(rule_matches), len(all_results),
+        len(rule_matches), llm_count, len(rule_matches) + llm_count,
     )
+
+
+def categorize_transactions(
+    transactions: list[dict],
+    categories: list[str],
+    model_name: Optional[str] = None,
+) -> dict[int, str]:
+    """Categorise transactions using a 3-layer approach:
+
+    Layer 1: Apply keyword rules from user corrections (instant, exact).
+    Layer 2: LLM with enriched context for remaining transactions.
+
+    Args:
+        transactions: list of dicts with 'id', 'description', and optionally
+                      'amount', 'type', 'date', 'email_body'.
+        categories: allowed category names.
+
+    Returns:
+        dict mapping transaction id -> category string.
+    """
+    all_results: dict[int, str] = {}
+    for _done, _total, partial in categorize_transactions_chunked(
+        transactions, categories, model_name
+    ):
+        all_results.update(partial)
     return all_results
 
 
@@ -2,6 +2,7 @@ import re
 import shutil
 import sqlite3
 import os
+import threading
 from contextlib import contextmanager
 from typing import Optional
 
@@ -17,9 +18,22 @@ DEFAULT_CATEGORIES = [
 ]
 
 
+# Connection owned by the enclosing transaction() block, per thread
+_active = threading.local()
+
+
 @contextmanager
 def get_connection():
-    """Yield a SQLite connection with row_factory set."""
+    """Yield a SQLite connection with row_factory set.
+
+    Inside a transaction() block this is the block's connection, and
+    commit / rollback are left to the block.
+    """
+    conn = getattr(_active, "conn", None)
+    if conn is not None:
+        yield conn
+        return
+
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
@@ -33,6 +47,25 @@ def get_connection():
         conn.close()
 
 
+@contextmanager
+def transaction():
+    """Run every database call in the block on one connection and commit once.
+
+    Rolls everything back if the block raises. Nested blocks join the
+    outer one.
+    """
+    if getattr(_active, "conn", None) is not None:
+        yield
+        return
+
+    with get_connection() as conn:
+        _active.conn = conn
+        try:
+            yield
+        finally:
+            _active.conn = None
+
+
 def init_db():
     """Create tables if they don't exist and seed default categories.
 
@@ -260,6 +293,16 @@ def get_categorized_examples(limit: int = 30) -> list[dict]:
 # Transaction helpers
 # ---------------------------------------------------------------------------
 
+_INSERT_TRANSACTION_SQL = """
+    INSERT INTO transactions
+        (date, description, amount, type, source, category,
+         is_cc_payment, is_excluded, month, year, uploaded_file, email_body)
+    VALUES
+        (:date, :description, :amount, :type, :source, :category,
+         :is_cc_payment, :is_excluded, :month, :year, :uploaded_file, :email_body)
+"""
+
+
 def insert_transactions(rows: list[dict]) -> int:
     """Bulk-insert parsed transactions. Returns number of rows inserted."""
     if not rows:
@@ -269,20 +312,24 @@ def insert_transactions(rows: list[dict]) -> int:
         r.setdefault("email_body", None)
 
     with get_connection() as conn:
-        conn.executemany(
-            """
-            INSERT INTO transactions
-                (date, description, amount, type, source, category,
-                 is_cc_payment, is_excluded, month, year, uploaded_file, email_body)
-            VALUES
-                (:date, :description, :amount, :type, :source, :category,
-                 :is_cc_payment, :is_excluded, :month, :year, :uploaded_file, :email_body)
-            """,
-            rows,
-        )
+        conn.executemany(_INSERT_TRANSACTION_SQL, rows)
     return len(rows)
 
 
+def insert_transactions_returning_ids(rows: list[dict]) -> list[int]:
+    """Insert parsed transactions in one DB transaction and return their ids.
+
+    Ids are in the same order as `rows`.
+    """
+    if not rows:
+        return []
+    for r in rows:
+        r.setdefault("email_body", None)
+
+    with get_connection() as conn:
+        return [conn.execute(_INSERT_TRANSACTION_SQL, r).lastrowid for r in rows]
+
+
 def _apply_email_filter(
     query: str, params: list, email_only: Optional[bool],
 ) -> tuple[str, list]:
@@ -299,14 +346,31 @@ def _apply_email_filter(
     return query, params
 
 
+# ORDER BY clauses accepted by get_transactions(order_by=...). Ties fall
+# back to newest-first so every ordering is deterministic.
+TRANSACTION_ORDERS = {
+    "date_desc": "date DESC, id DESC",
+    "date_asc": "date ASC, id ASC",
+    "amount_desc": "amount DESC, date DESC, id DESC",
+    "amount_asc": "amount ASC, date DESC, id DESC",
+    "category": "LOWER(COALESCE(NULLIF(category, ''), 'zzz')), date DESC, id DESC",
+}
+
+
 def get_transactions(
     month: Optional[int] = None,
     year: Optional[int] = None,
     source: Optional[str] = None,
     include_excluded: bool = False,
     email_only: Optional[bool] = None,
+    category: Optional[str] = None,
+    uncategorized_only: bool = False,
+    order_by: str = "date_desc",
 ) -> list[dict]:
-    """Fetch transactions with optional filters."""
+    """Fetch transactions with optional filters.
+
+    `order_by` is a key of TRANSACTION_ORDERS.
+    """
     query = "SELECT * FROM transactions WHERE 1=1"
     params: list = []
 
@@ -321,9 +385,33 @@ def get_transactions(
         params.append(source)
     if not include_excluded:
         query += " AND is_excluded = 0"
+    if uncategorized_only:
+        query += " AND (category IS NULL OR category = '')"
+    elif category is not None:
+        query += " AND category = ?"
+        params.append(category)
 
     query, params = _apply_email_filter(query, params, email_only)
-    query += " ORDER BY date DESC, id DESC"
+    query += f" ORDER BY {TRANSACTION_ORDERS[order_by]}"
+
+    with get_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+    return [dict(r) for r in rows]
+
+
+def get_top_expenses(
+    month: int, year: int, limit: int = 10,
+    email_only: Optional[bool] = None,
+) -> list[dict]:
+    """Return the largest non-excluded debits for a month, biggest first."""
+    query = (
+        "SELECT date, description, amount, category, source FROM transactions "
+        "WHERE month = ? AND year = ? AND type = 'debit' AND is_excluded = 0"
+    )
+    params: list = [month, year]
+    query, params = _apply_email_filter(query, params, email_only)
+    query += " ORDER BY amount DESC, date DESC, id DESC LIMIT ?"
+    params.append(limit)
 
     with get_connection() as conn:
         rows = conn.execute(query, params).fetchall()
@@ -356,15 +444,6 @@ def update_transaction_category(txn_id: int, category: str) -> None:
         )
 
 
-def update_transaction_exclusion(txn_id: int, is_excluded: bool) -> None:
-    """Mark/unmark a transaction as excluded from totals."""
-    with get_connection() as conn:
-        conn.execute(
-            "UPDATE transactions SET is_excluded = ? WHERE id = ?",
-            (int(is_excluded), txn_id),
-        )
-
-
 def bulk_update_categories(updates: dict[int, str]) -> None:
     """Update categories for multiple transactions at once.
 
@@ -380,6 +459,33 @@ def bulk_update_categories(updates: dict[int, str]) -> None:
         )
 
 
+def set_category_for_ids(txn_ids: list[int], category: str) -> None:
+    """Give every transaction in `txn_ids` the same category in one UPDATE."""
+    if not txn_ids:
+        return
+    placeholders = ", ".join("?" for _ in txn_ids)
+    with get_connection() as conn:
+        conn.execute(
+            f"UPDATE transactions SET category = ? WHERE id IN ({placeholders})",
+            [category, *txn_ids],
+        )
+
+
+def bulk_update_exclusions(updates: dict[int, bool]) -> None:
+    """Set the excluded flag for multiple transactions at once.
+
+    Args:
+        updates: mapping of transaction id -> excluded
+    """
+    if not updates:
+        return
+    with get_connection() as conn:
+        conn.executemany(
+            "UPDATE transactions SET is_excluded = ? WHERE id = ?",
+            [(int(excluded), tid) for tid, excluded in updates.items()],
+        )
+
+
 def flag_cc_payments(txn_ids: list[int], flag: bool = True) -> None:
     """Flag transactions as credit-card payments and exclude them."""
     if not txn_ids:
@@ -451,6 +557,38 @@ def get_monthly_summary(
     return dict(row)
 
 
+def get_monthly_summary_bulk(email_only: Optional[bool] = None) -> list[dict]:
+    """Return the get_monthly_summary() aggregates for every month at once.
+
+    One row per (year, month) that has non-excluded transactions, sorted
+    chronologically. Used by the trend chart instead of N per-month queries.
+    """
+    email_clause = ""
+    if email_only is True:
+        email_clause = "AND uploaded_file LIKE 'email_%'"
+    elif email_only is False:
+        email_clause = "AND (uploaded_file IS NULL OR uploaded_file NOT LIKE 'email_%')"
+
+    with get_connection() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT
+                year,
+                month,
+                COALESCE(SUM(CASE WHEN type = 'credit' THEN amount ELSE 0 END), 0) AS total_earnings,
+                COALESCE(SUM(CASE WHEN type = 'debit'  THEN amount ELSE 0 END), 0) AS total_expenses,
+                COALESCE(SUM(CASE WHEN type = 'credit' AND category = 'Transfer' THEN amount ELSE 0 END), 0) AS transfer_in,
+                COALESCE(SUM(CASE WHEN type = 'debit'  AND category = 'Transfer' THEN amount ELSE 0 END), 0) AS transfer_out,
+                COALESCE(SUM(CASE WHEN type = 'debit'  AND category = 'Investment' THEN amount ELSE 0 END), 0) AS investment
+            FROM transactions
+            WHERE is_excluded = 0 {email_clause}
+            GROUP BY year, month
+            ORDER BY year, month
+            """
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
 def get_category_breakdown(
     month: int, year: int, email_only: Optional[bool] = None,
 ) -> list[dict]:
@@ -477,56 +615,93 @@ def get_category_breakdown(
     return [dict(r) for r in rows]
 
 
-def find_similar_transactions(
-    description: str, current_id: int, old_category: Optional[str] = None,
-    email_only: Optional[bool] = None,
-) -> list[dict]:
-    """Find transactions with similar descriptions for bulk re-categorization.
+# Common bank/rail tokens that say nothing about the merchant or payee
+_SIMILAR_GENERIC = {
+    "BANK", "HDFC", "ICICI", "AXIS", "YESB", "SBIN", "PAID", "PAYMENT",
+    "PAYMEN", "LIMITED", "LTD", "NAVI", "INDIA", "POST", "UPI",
+    "P2M", "P2A", "P2V", "NEFT", "RTGS", "IMPS",
+}
 
-    Extracts the merchant/payee name from the description and searches for
-    other transactions containing that name. Does NOT filter by old category
-    so it catches all related transactions regardless of their current state.
-    """
+
+def _similar_keywords(description: str) -> list[str]:
+    """Return up to 2 upper-cased merchant/payee keywords from a description."""
     # Extract meaningful keywords, skipping common generic terms
-    _GENERIC = {
-        "BANK", "HDFC", "ICICI", "AXIS", "YESB", "SBIN", "PAID", "PAYMENT",
-        "PAYMEN", "LIMITED", "LTD", "NAVI", "INDIA", "POST", "UPI",
-        "P2M", "P2A", "P2V", "NEFT", "RTGS", "IMPS",
-    }
     tokens = re.split(r"[/\-\s,.|]+", description)
     keywords = [
         t.strip().upper() for t in tokens
         if len(t.strip()) >= 4
         and not t.strip().isdigit()
-        and t.strip().upper() not in _GENERIC
+        and t.strip().upper() not in _SIMILAR_GENERIC
     ]
 
     if not keywords:
         # Fallback: use any 4+ char tokens
         keywords = [t.strip().upper() for t in tokens if len(t.strip()) >= 4 and not t.strip().isdigit()]
 
-    if not keywords:
-        return []
-
     # Use at most 2 keywords (less strict = more matches)
-    search_kw = keywords[:2]
-    like_clauses = " AND ".join("UPPER(description) LIKE ?" for _ in search_kw)
-    params: list = [f"%{kw}%" for kw in search_kw]
-    params.append(current_id)
+    return keywords[:2]
+
+
+def find_similar_transactions(
+    description: str, current_id: int, old_category: Optional[str] = None,
+    email_only: Optional[bool] = None,
+) -> list[dict]:
+    """Find transactions with similar descriptions to one row (newest first).
+
+    Single-row form of find_similar_transactions_batch, which holds the only
+    copy of the matching query. `old_category` is accepted for backwards
+    compatibility and ignored.
+    """
+    return find_similar_transactions_batch(
+        [(current_id, description)], email_only,
+    ).get(current_id, [])
+
+
+def find_similar_transactions_batch(
+    items: list[tuple[int, str]], email_only: Optional[bool] = None,
+) -> dict[int, list[dict]]:
+    """Find transactions with similar descriptions for bulk re-categorization.
+
+    Extracts the merchant/payee keywords from each description and matches
+    every other transaction containing them, whatever its current category,
+    so the user can bulk-update them all. All rows are looked up in a single
+    query.
+
+    items: (transaction id, description) pairs. Returns a dict mapping each
+    id to its similar transactions (newest first); ids whose description
+    yields no keywords are left out.
+    """
+    needles = []
+    for txn_id, description in items:
+        search_kw = _similar_keywords(description)
+        if search_kw:
+            needles.append((txn_id, search_kw[0], search_kw[1] if len(search_kw) > 1 else None))
+    if not needles:
+        return {}
 
-    # Don't filter by old_category -- find ALL similar transactions
-    # regardless of their current category so user can bulk-update them all
+    # Join every transaction against an inline table of (source id, keywords)
+    values = ", ".join("(?, ?, ?)" for _ in needles)
+    params: list = [v for needle in needles for v in needle]
     query = f"""
-        SELECT * FROM transactions
-        WHERE {like_clauses} AND id != ?
+        WITH q(src_id, kw1, kw2) AS (VALUES {values})
+        SELECT q.src_id AS _src_id, t.* FROM transactions t
+        JOIN q ON UPPER(t.description) LIKE '%' || q.kw1 || '%'
+            AND (q.kw2 IS NULL OR UPPER(t.description) LIKE '%' || q.kw2 || '%')
+            AND t.id != q.src_id
+        WHERE 1=1
     """
 
     query, params = _apply_email_filter(query, params, email_only)
-    query += " ORDER BY date DESC"
+    query += " ORDER BY q.src_id, t.date DESC"
 
     with get_connection() as conn:
         rows = conn.execute(query, params).fetchall()
-    return [dict(r) for r in rows]
+
+    similar: dict[int, list[dict]] = {}
+    for r in rows:
+        row = dict(r)
+        similar.setdefault(row.pop("_src_id"), []).append(row)
+    return similar
 
 
 def get_upload_history(email_only: Optional[bool] = None) -> list[dict]:
@@ -566,41 +741,57 @@ def find_duplicate_transactions(
     if not txns:
         return []
 
-    email_clause = ""
-    if email_only is True:
-        email_clause = "AND uploaded_file LIKE 'email_%'"
-    elif email_only is False:
-        email_clause = "AND (uploaded_file IS NULL OR uploaded_file NOT LIKE 'email_%')"
+    # Load the candidates into a temp table and match them all in one join,
+    # rather than one scan of transactions per candidate
+    query = """
+        SELECT n.idx AS _new_idx, t.id, t.description, t.uploaded_file
+        FROM _dup_candidates n
+        JOIN transactions t
+            ON t.date = n.date AND t.amount = n.amount AND t.type = n.type
+        WHERE 1=1
+    """
+    query, params = _apply_email_filter(query, [], email_only)
+    query += " ORDER BY n.idx, t.id"
 
-    duplicates = []
     with get_connection() as conn:
-        for i, t in enumerate(txns):
-            rows = conn.execute(
-                f"""
-                SELECT id, date, description, amount, type, source, uploaded_file
-                FROM transactions
-                WHERE date = ? AND amount = ? AND type = ? {email_clause}
-                """,
-                (t["date"], t["amount"], t["type"]),
-            ).fetchall()
-
-            for row in rows:
-                # Fuzzy match on description: check if key words overlap
-                db_desc = row["description"].upper()
-                new_desc = t["description"].upper()
-                # Extract 4+ char tokens
-                db_tokens = set(w for w in re.split(r"[/\-\s,.|]+", db_desc) if len(w) >= 4)
-                new_tokens = set(w for w in re.split(r"[/\-\s,.|]+", new_desc) if len(w) >= 4)
-                overlap = db_tokens & new_tokens
-                if len(overlap) >= 2 or db_desc == new_desc:
-                    duplicates.append({
-                        "new_idx": i,
-                        "new_txn": t,
-                        "existing_id": row["id"],
-                        "existing_desc": row["description"],
-                        "existing_file": row["uploaded_file"],
-                    })
-                    break  # one match is enough per new txn
+        conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS _dup_candidates "
+            "(idx INTEGER, date TEXT, amount REAL, type TEXT)"
+        )
+        conn.execute("DELETE FROM _dup_candidates")
+        conn.executemany(
+            "INSERT INTO _dup_candidates VALUES (?, ?, ?, ?)",
+            [(i, t["date"], t["amount"], t["type"]) for i, t in enumerate(txns)],
+        )
+        rows = conn.execute(query, params).fetchall()
+        conn.execute("DROP TABLE _dup_candidates")
+
+    duplicates = []
+    matched: set[int] = set()
+    new_tokens: dict[int, set[str]] = {}
+    for row in rows:
+        i = row["_new_idx"]
+        if i in matched:
+            continue  # one match is enough per new txn
+        t = txns[i]
+
+        # Fuzzy match on description: check if key words overlap
+        db_desc = row["description"].upper()
+        new_desc = t["description"].upper()
+        # Extract 4+ char tokens
+        db_tokens = set(w for w in re.split(r"[/\-\s,.|]+", db_desc) if len(w) >= 4)
+        if i not in new_tokens:
+            new_tokens[i] = set(w for w in re.split(r"[/\-\s,.|]+", new_desc) if len(w) >= 4)
+        overlap = db_tokens & new_tokens[i]
+        if len(overlap) >= 2 or db_desc == new_desc:
+            matched.add(i)
+            duplicates.append({
+                "new_idx": i,
+                "new_txn": t,
+                "existing_id": row["id"],
+                "existing_desc": row["description"],
+                "existing_file": row["uploaded_file"],
+            })
 
     return duplicates
 
@@ -630,6 +821,18 @@ def delete_transactions_by_file(filename: str) -> int:
     return cursor.rowcount
 
 
+def delete_transactions_by_files(filenames: list[str]) -> int:
+    """Delete all transactions from several uploaded files in one DELETE. Returns count deleted."""
+    if not filenames:
+        return 0
+    placeholders = ", ".join("?" for _ in filenames)
+    with get_connection() as conn:
+        cursor = conn.execute(
+            f"DELETE FROM transactions WHERE uploaded_file IN ({placeholders})", list(filenames)
+        )
+    return cursor.rowcount
+
+
 # ---------------------------------------------------------------------------
 # Settings helpers (key-value store for app configuration)
 # ---------------------------------------------------------------------------
@@ -170,6 +170,22 @@ _IMAP_SEARCHES = [
 ]
 
 
+def _or_search(terms: list[tuple[str, str]]) -> str:
+    """Chain (field, keyword) terms into one nested IMAP OR criterion."""
+    criteria = [f'{field} "{keyword}"' for field, keyword in terms]
+    combined = criteria[-1]
+    for criterion in reversed(criteria[:-1]):
+        combined = f"OR {criterion} {combined}"
+    return combined
+
+
+_SEARCH_ANY_ALERT = _or_search(_IMAP_SEARCHES)
+
+# Messages downloaded per FETCH command. Large enough to amortise the
+# round-trip, small enough that progress and cancel stay responsive.
+_FETCH_BATCH_SIZE = 50
+
+
 class FetchCancelledError(Exception):
     """Raised when the user cancels the email fetch."""
 
@@ -185,9 +201,10 @@ def fetch_transaction_emails(
     """Fetch and parse all bank transaction alert emails for a given month.
 
     Strategy (fast server-side search):
-      1. Run a small number of targeted IMAP SUBJECT and FROM searches
-         (server-side, no downloading) to find candidate email IDs.
-      2. Download full bodies only for the candidates.
+      1. Run the targeted IMAP SUBJECT and FROM searches as one OR-ed
+         SEARCH (server-side, no downloading) to find candidate email IDs,
+         falling back to one search per term if the server rejects it.
+      2. Download full bodies only for the candidates, in batched FETCHes.
       3. Parse transaction details from each alert email.
 
     Args:
@@ -226,16 +243,30 @@ def fetch_transaction_emails(
 
     _progress("search", "Searching inbox for bank transaction alerts...")
 
-    for i, (field, keyword) in enumerate(_IMAP_SEARCHES):
-        _check_cancel()
-        _progress("search", f"Searching {i + 1}/{total_searches}: {keyword}")
-        try:
-            criteria = f'({date_filter} {field} "{keyword}")'
-            status, message_ids = mail.search(None, criteria)
-            if status == "OK" and message_ids[0]:
-                candidate_ids.update(message_ids[0].split())
-        except imaplib.IMAP4.error:
-            continue
+    # All terms OR-ed into one SEARCH: a single round-trip and a single
+    # pass over the mailbox on the server
+    combined = None
+    try:
+        status, message_ids = mail.search(None, f"({date_filter} {_SEARCH_ANY_ALERT})")
+        if status == "OK":
+            combined = message_ids[0].split() if message_ids[0] else []
+    except imaplib.IMAP4.error:
+        pass
+
+    if combined is not None:
+        candidate_ids.update(combined)
+    else:
+        # Server rejected the nested OR: fall back to one search per term
+        for i, (field, keyword) in enumerate(_IMAP_SEARCHES):
+            _check_cancel()
+            _progress("search", f"Searching {i + 1}/{total_searches}: {keyword}")
+            try:
+                criteria = f'({date_filter} {field} "{keyword}")'
+                status, message_ids = mail.search(None, criteria)
+                if status == "OK" and message_ids[0]:
+                    candidate_ids.update(message_ids[0].split())
+            except imaplib.IMAP4.error:
+                continue
 
     if not candidate_ids:
         _progress("done", "No bank alert emails found.")
@@ -244,53 +275,63 @@ def fetch_transaction_emails(
     total_candidates = len(candidate_ids)
     _progress("download", f"Found {total_candidates} candidate emails. Downloading...")
 
-    # --- Pass 2: Download full bodies and parse ---
+    # --- Pass 2: Download full bodies in batches and parse ---
+    # One FETCH per batch of message numbers instead of one round-trip per
+    # message; cancellation and progress are checked between batches.
     transactions = []
-    candidate_list = list(candidate_ids)
+    candidate_list = sorted(candidate_ids, key=int)
     skipped_filter = 0
     skipped_no_body = 0
     skipped_no_extract = 0
     skipped_subjects = []  # track what subjects failed extraction
 
-    for i, msg_id in enumerate(candidate_list):
+    for start in range(0, total_candidates, _FETCH_BATCH_SIZE):
         _check_cancel()
-        if (i + 1) % 5 == 0 or i == 0:
-            _progress("download",
-                f"Processing {i + 1}/{total_candidates} "
-                f"({len(transactions)} extracted so far)")
+        batch = candidate_list[start:start + _FETCH_BATCH_SIZE]
+        _progress("download",
+            f"Processing {start + 1}-{start + len(batch)}/{total_candidates} "
+            f"({len(transactions)} extracted so far)")
 
         try:
-            status, msg_data = mail.fetch(msg_id, "(RFC822)")
-            if status != "OK":
-                continue
-
-            raw_email = msg_data[0][1]
-            msg = email.message_from_bytes(raw_email)
-
-            sender = _get_sender(msg)
-            subject = _get_subject(msg)
-            email_date = _get_email_date(msg)
+            status, msg_data = mail.fetch(b",".join(batch).decode(), "(RFC822)")
+        except imaplib.IMAP4.error as e:
+            logger.warning("Error fetching emails: %s", e)
+            continue
+        if status != "OK":
+            continue
 
-            # Double-check with local filter (server search can be loose)
-            if not _is_transaction_alert(sender, subject):
-                skipped_filter += 1
+        # Each message arrives as a (envelope, raw bytes) tuple; the closing
+        # b")" lines between them carry no data
+        for part in msg_data:
+            if not isinstance(part, tuple):
                 continue
-
-            body = _get_email_body(msg)
-            if not body:
-                skipped_no_body += 1
+            try:
+                msg = email.message_from_bytes(part[1])
+
+                sender = _get_sender(msg)
+                subject = _get_subject(msg)
+                email_date = _get_email_date(msg)
+
+                # Double-check with local filter (server search can be loose)
+                if not _is_transaction_alert(sender, subject):
+                    skipped_filter += 1
+                    continue
+
+                body = _get_email_body(msg)
+                if not body:
+                    skipped_no_body += 1
+                    continue
+
+                txn = _extract_transaction(body, subject, email_date)
+                if txn:
+                    transactions.append(txn)
+                else:
+                    skipped_no_extract += 1
+                    skipped_subjects.append(subject[:80])
+            except Exception as e:
+                logger.warning("Error processing email: %s", e)
                 continue
 
-            txn = _extract_transaction(body, subject, email_date)
-            if txn:
-                transactions.append(txn)
-            else:
-                skipped_no_extract += 1
-                skipped_subjects.append(subject[:80])
-        except Exception as e:
-            logger.warning("Error processing email: %s", e)
-            continue
-
     # Log diagnostic summary
     logger.info(
         "Fetch summary: %d candidates, %d extracted, "
@@ -786,13 +827,19 @@ def fetch_transactions_from_email(
     folder: str = "INBOX",
     on_progress: Optional[callable] = None,
     is_cancelled: Optional[callable] = None,
+    mail: Optional[imaplib.IMAP4_SSL] = None,
 ) -> list[dict]:
     """Complete pipeline: connect, fetch, parse, and return transactions.
 
+    If ``mail`` is an already logged-in connection it is used instead of
+    opening a new one, and is left open for the caller to reuse.
+
     Raises EmailConnectionError on connection/auth failure.
     Raises FetchCancelledError if user cancels mid-fetch.
     """
-    mail = connect_imap(host, port, email_address, password)
+    owns_connection = mail is None
+    if owns_connection:
+        mail = connect_imap(host, port, email_address, password)
     try:
         transactions = fetch_transaction_emails(
             mail, month, year, folder,
@@ -800,7 +847,8 @@ def fetch_transactions_from_email(
             is_cancelled=is_cancelled,
         )
     finally:
-        disconnect_imap(mail)
+        if owns_connection:
+            disconnect_imap(mail)
 
     # Deduplicate by date + amount + type (emails can sometimes repeat)
     seen = set()
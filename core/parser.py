@@ -10,18 +10,46 @@ import csv
 import io
 import json
 import logging
+import mmap
 import os
 import re
+import sys
+import time
 from datetime import datetime
-from typing import Optional
+from functools import lru_cache, partial
+from typing import Callable, Optional
 
+import numpy as np
 import pandas as pd
 import pdfplumber
 import requests
+from requests.adapters import HTTPAdapter
+
+try:  # optional: orjson is several times faster on large model payloads
+    import orjson
+
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+try:  # optional (ships with streamlit): Arrow kernels for bulk str -> float
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None
 
 logger = logging.getLogger(__name__)
 
 
+# Shared transaction-type values so every emitted dict points at the same
+# two string objects (vision-model JSON would otherwise allocate its own)
+_DEBIT = sys.intern("debit")
+_CREDIT = sys.intern("credit")
+
 # ---- Common date formats found in Indian bank statements ----
 DATE_FORMATS = [
     "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y",
@@ -30,12 +58,29 @@ DATE_FORMATS = [
 ]
 
 
+# All-numeric formats can only match digits and separators, and month-name
+# formats need letters, so a quick sniff picks the half worth trying.
+# Order within each half is preserved (it decides ambiguous d/m dates).
+_NUMERIC_DATE_RE = re.compile(r"\d{1,4}[/-]\d{1,2}[/-]\d{1,4}")
+_NUMERIC_DATE_FORMATS = [f for f in DATE_FORMATS if "%b" not in f and "%B" not in f]
+_NAMED_DATE_FORMATS = [f for f in DATE_FORMATS if "%b" in f or "%B" in f]
+
+
 def _parse_date(value: str) -> Optional[str]:
     """Try multiple date formats and return ISO date string or None."""
     if not isinstance(value, str):
         value = str(value)
-    value = value.strip()
-    for fmt in DATE_FORMATS:
+    return _parse_date_cached(value.strip())
+
+
+@lru_cache(maxsize=8192)
+def _parse_date_cached(value: str) -> Optional[str]:
+    """Memoised core of _parse_date (statements repeat the same dates)."""
+    if _NUMERIC_DATE_RE.fullmatch(value):
+        formats = _NUMERIC_DATE_FORMATS
+    else:
+        formats = _NAMED_DATE_FORMATS
+    for fmt in formats:
         try:
             return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
         except ValueError:
@@ -43,12 +88,16 @@ def _parse_date(value: str) -> Optional[str]:
     return None
 
 
+# Currency symbols, thousands separators and whitespace inside amount cells
+_AMOUNT_CLEAN_RE = re.compile(r"[₹$,\s]")
+
+
 def _clean_amount(value) -> Optional[float]:
     """Convert an amount value (possibly with commas/currency symbols) to float."""
-    if value is None or (isinstance(value, float) and pd.isna(value)):
+    if value is None or (isinstance(value, float) and value != value):  # NaN
         return None
     s = str(value).strip()
-    s = re.sub(r"[₹$,\s]", "", s)
+    s = _AMOUNT_CLEAN_RE.sub("", s)
     s = s.replace("(", "-").replace(")", "")  # parentheses = negative
     if not s or s == "-" or s == "":
         return None
@@ -81,28 +130,69 @@ _CREDIT_KEYWORDS = {
 _AMOUNT_KEYWORDS = {"amount", "transaction amount", "txn amount", "amt"}
 
 
-def _match_column(col: str, keywords: set[str]) -> bool:
-    """Check if a column name loosely matches any keyword."""
-    normalised = col.strip().lower()
-    return normalised in keywords or any(k in normalised for k in keywords)
+def _keyword_pattern(keywords: set[str]) -> re.Pattern:
+    """Compile a keyword set into a single substring alternation."""
+    return re.compile("|".join(map(re.escape, sorted(keywords, key=len, reverse=True))))
+
+
+# One compiled alternation per keyword set, so a column name / header line is
+# scanned once by the regex engine instead of once per keyword
+_DATE_KW_RE = _keyword_pattern(_DATE_KEYWORDS)
+_DESC_KW_RE = _keyword_pattern(_DESC_KEYWORDS)
+_DEBIT_KW_RE = _keyword_pattern(_DEBIT_KEYWORDS)
+_CREDIT_KW_RE = _keyword_pattern(_CREDIT_KEYWORDS)
+_AMOUNT_KW_RE = _keyword_pattern(_AMOUNT_KEYWORDS)
+_ANY_AMOUNT_KW_RE = _keyword_pattern(_DEBIT_KEYWORDS | _CREDIT_KEYWORDS | _AMOUNT_KEYWORDS)
+
+# Byte-level variants for scanning raw CSV bytes for the header line
+_DATE_KW_BRE = re.compile(_DATE_KW_RE.pattern.encode("ascii"))
+_ANY_AMOUNT_KW_BRE = re.compile(_ANY_AMOUNT_KW_RE.pattern.encode("ascii"))
+
+
+def _match_column(normalised: str, keywords: re.Pattern) -> bool:
+    """Check if a stripped, lowercased column name loosely matches any keyword."""
+    return keywords.search(normalised) is not None
+
+
+# Roles in assignment priority order
+_ROLE_PATTERNS = (
+    ("date", _DATE_KW_RE),
+    ("description", _DESC_KW_RE),
+    ("debit", _DEBIT_KW_RE),
+    ("credit", _CREDIT_KW_RE),
+    ("amount", _AMOUNT_KW_RE),
+)
+
+# Column names that are exactly a keyword (the usual case) resolve with one
+# dict lookup. Values list every role whose keywords occur in the name,
+# e.g. "description" also contains "cr".
+_KEYWORD_ROLES = {
+    kw: frozenset(role for role, pattern in _ROLE_PATTERNS if _match_column(kw, pattern))
+    for kw in _DATE_KEYWORDS | _DESC_KEYWORDS | _DEBIT_KEYWORDS | _CREDIT_KEYWORDS | _AMOUNT_KEYWORDS
+}
 
 
 def _detect_columns(df: pd.DataFrame) -> dict:
     """Auto-detect date, description, debit, credit, and amount columns."""
     mapping = {"date": None, "description": None, "debit": None, "credit": None, "amount": None}
 
-    for col in df.columns:
-        col_str = str(col)
-        if mapping["date"] is None and _match_column(col_str, _DATE_KEYWORDS):
-            mapping["date"] = col
-        elif mapping["description"] is None and _match_column(col_str, _DESC_KEYWORDS):
-            mapping["description"] = col
-        elif mapping["debit"] is None and _match_column(col_str, _DEBIT_KEYWORDS):
-            mapping["debit"] = col
-        elif mapping["credit"] is None and _match_column(col_str, _CREDIT_KEYWORDS):
-            mapping["credit"] = col
-        elif mapping["amount"] is None and _match_column(col_str, _AMOUNT_KEYWORDS):
-            mapping["amount"] = col
+    # Normalise each column name once instead of once per keyword set
+    norm_cols = [(col, str(col).strip().lower()) for col in df.columns]
+
+    for col, norm in norm_cols:
+        known = _KEYWORD_ROLES.get(norm)
+        for role, pattern in _ROLE_PATTERNS:
+            if mapping[role] is None and (
+                role in known if known is not None else _match_column(norm, pattern)
+            ):
+                mapping[role] = col
+                break
+        else:
+            continue
+
+        # Every role assigned -- remaining columns can't change the mapping
+        if all(v is not None for v in mapping.values()):
+            break
 
     return mapping
 
@@ -122,55 +212,113 @@ def parse_csv(file_bytes: bytes, filename: str) -> tuple[list[dict], dict]:
     They also have unbalanced quotes in narration fields.
     """
     if filename.endswith((".xlsx", ".xls")):
-        df = pd.read_excel(io.BytesIO(file_bytes))
+        df = _tidy_frame(pd.read_excel(io.BytesIO(file_bytes)))
     else:
-        df = _read_csv_robust(file_bytes)
-
-    # Drop fully empty rows/columns
-    df = df.dropna(how="all").dropna(axis=1, how="all")
-    df.columns = [str(c).strip() for c in df.columns]
+        df = _read_csv_columns(partial(_read_csv_robust, file_bytes))
 
     mapping = _detect_columns(df)
     transactions = _dataframe_to_transactions(df, mapping)
     return transactions, mapping
 
 
-def _strip_preamble(file_bytes: bytes) -> bytes:
-    """Strip preamble/customer-info rows from bank CSV and return only the
-    header + data portion as raw bytes.
+# Preamble rows always sit at the top of the file, so the header scan only
+# looks at this many leading bytes.
+_HEADER_SCAN_BYTES = 64 * 1024
 
-    Indian bank CSVs (Axis, HDFC, ICICI, SBI, etc.) commonly have 10-20 lines
-    of account info before the actual transaction table. We find the header
-    line by looking for one that contains both a date keyword AND a
-    debit/credit/amount keyword, then return everything from that line onward.
+
+def parse_csv_from_path(path: str) -> tuple[list[dict], dict]:
+    """Parse a CSV or Excel statement straight from disk.
+
+    Same result as parse_csv, but for large files: the preamble scan runs
+    over a memory-mapped view of the file and pandas reads from a file
+    handle positioned at the header, so the statement is never held as a
+    separate bytes copy. The app itself doesn't call this (uploads arrive
+    as bytes); it is for scripts importing statements from disk.
     """
-    # Decode just for scanning (latin-1 never fails)
-    text = file_bytes.decode("latin-1", errors="replace")
-    lines = text.split("\n")
+    if path.endswith((".xlsx", ".xls")):
+        df = _tidy_frame(pd.read_excel(path))
+    else:
+        offset = None
+        if os.path.getsize(path) > 0:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                offset = _find_header_offset(mm)
 
-    all_date_kw = _DATE_KEYWORDS | {"date"}
+        with open(path, "rb") as f:
+            def open_at_header():
+                # Every parse attempt starts again from the header line
+                f.seek(offset or 0)
+                return f
 
-    for i, line in enumerate(lines):
-        line_lower = line.strip().lower()
+            df = _read_csv_columns(partial(_read_csv_attempts, open_at_header))
+
+    mapping = _detect_columns(df)
+    transactions = _dataframe_to_transactions(df, mapping)
+    return transactions, mapping
+
+
+def _tidy_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop fully empty rows/columns and strip whitespace from column names."""
+    df = df.dropna(how="all").dropna(axis=1, how="all")
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+def _read_csv_columns(read_csv: Callable[..., pd.DataFrame]) -> pd.DataFrame:
+    """Read a bank CSV, loading only the columns we actually use.
+
+    `read_csv` performs the actual read and accepts pd.read_csv keyword
+    arguments (e.g. a partial of _read_csv_robust).
+
+    Column detection runs on a small sample first; the full read is then
+    restricted to the detected columns and kept as plain strings (every cell
+    is re-parsed by _parse_date / _clean_amount anyway). Falls back to a full
+    read when detection on the sample is inconclusive.
+    """
+    sample = read_csv(nrows=200)
+    sample.columns = [str(c).strip() for c in sample.columns]
+    mapping = _detect_columns(sample)
+
+    has_amount = mapping["amount"] or (mapping["debit"] and mapping["credit"])
+    if mapping["date"] and has_amount:
+        wanted = {c for c in mapping.values() if c is not None}
+        df = _tidy_frame(read_csv(
+            usecols=lambda c: str(c).strip() in wanted,
+            dtype=str,
+        ))
+        # A different parse strategy on the full file can rename columns
+        if wanted.issubset(df.columns):
+            return df
+
+    return _tidy_frame(read_csv())
+
+
+def _find_header_offset(data) -> Optional[int]:
+    """Return the byte offset of the transaction-table header line, or None.
+
+    The header is the first line containing both a date keyword AND a
+    debit/credit/amount keyword. Scans raw bytes (or an mmap) line by line
+    without decoding. Only the first _HEADER_SCAN_BYTES are examined since
+    preambles sit at the top.
+    """
+    end = min(len(data), _HEADER_SCAN_BYTES)
+    pos = 0
+    while pos < end:
+        nl = data.find(b"\n", pos, end)
+        line_end = end if nl == -1 else nl
+        line = data[pos:line_end].lower()
         # Require at least 2 commas (to filter out prose lines that
         # accidentally contain the word "date")
-        if line_lower.count(",") < 2:
-            continue
-        has_date_col = any(kw in line_lower for kw in all_date_kw)
-        has_amount_col = (
-            any(kw in line_lower for kw in _DEBIT_KEYWORDS)
-            or any(kw in line_lower for kw in _CREDIT_KEYWORDS)
-            or any(kw in line_lower for kw in _AMOUNT_KEYWORDS)
-        )
-        if has_date_col and has_amount_col:
-            cleaned = "\n".join(lines[i:])
-            return cleaned.encode("latin-1", errors="replace")
-
-    # Header not found -- return original bytes
-    return file_bytes
+        if (
+            line.count(b",") >= 2
+            and _DATE_KW_BRE.search(line)
+            and _ANY_AMOUNT_KW_BRE.search(line)
+        ):
+            return pos
+        pos = line_end + 1
+    return None
 
 
-def _read_csv_robust(file_bytes: bytes) -> pd.DataFrame:
+def _read_csv_robust(file_bytes: bytes, **read_kwargs) -> pd.DataFrame:
     """Try progressively more lenient CSV parsing strategies.
 
     Indian bank CSVs commonly have:
@@ -178,16 +326,31 @@ def _read_csv_robust(file_bytes: bytes) -> pd.DataFrame:
     - Unbalanced quotes in narration/description fields
     - Footer rows with disclaimers and unbalanced quotes
     - Mixed encodings
+
+    Extra keyword arguments (nrows, usecols, dtype, ...) are passed through
+    to every pd.read_csv attempt.
     """
-    # Step 1: strip preamble so pandas sees the header as the first row
-    cleaned_bytes = _strip_preamble(file_bytes)
+    # Step 1: start at the header line so pandas sees it as the first row.
+    # This cuts at the header's byte offset rather than passing a line count
+    # as skiprows: pandas counts parsed records, and a quoted preamble field
+    # spanning several lines would throw that count off.
+    offset = _find_header_offset(file_bytes)
+    data = file_bytes[offset:] if offset else file_bytes
+    return _read_csv_attempts(lambda: io.BytesIO(data), **read_kwargs)
 
+
+def _read_csv_attempts(open_source: Callable[[], object], **read_kwargs) -> pd.DataFrame:
+    """Run the lenient parsing strategies of _read_csv_robust.
+
+    `open_source` returns a fresh pd.read_csv source (buffer or path) for
+    each attempt.
+    """
     encodings = ("utf-8", "latin-1", "cp1252")
 
     # Strategy 1: strict parse of cleaned CSV
     for enc in encodings:
         try:
-            return pd.read_csv(io.BytesIO(cleaned_bytes), encoding=enc)
+            return pd.read_csv(open_source(), encoding=enc, **read_kwargs)
         except (UnicodeDecodeError, pd.errors.ParserError):
             continue
 
@@ -195,8 +358,8 @@ def _read_csv_robust(file_bytes: bytes) -> pd.DataFrame:
     for enc in encodings:
         try:
             return pd.read_csv(
-                io.BytesIO(cleaned_bytes), encoding=enc,
-                on_bad_lines="skip",
+                open_source(), encoding=enc,
+                on_bad_lines="skip", **read_kwargs,
             )
         except (UnicodeDecodeError, pd.errors.ParserError):
             continue
@@ -206,59 +369,155 @@ def _read_csv_robust(file_bytes: bytes) -> pd.DataFrame:
     for enc in encodings:
         try:
             return pd.read_csv(
-                io.BytesIO(cleaned_bytes), encoding=enc,
-                quoting=csv.QUOTE_NONE, on_bad_lines="skip",
+                open_source(), encoding=enc,
+                quoting=csv.QUOTE_NONE, on_bad_lines="skip", **read_kwargs,
             )
         except (UnicodeDecodeError, pd.errors.ParserError):
             continue
 
     # Strategy 4: Python engine as final fallback
     return pd.read_csv(
-        io.BytesIO(cleaned_bytes), encoding="latin-1",
+        open_source(), encoding="latin-1",
         quoting=csv.QUOTE_NONE, on_bad_lines="skip",
-        engine="python", sep=",",
+        engine="python", sep=",", **read_kwargs,
+    )
+
+
+def _classify_debit_credit(
+    debit: np.ndarray, credit: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Classify rows of separate debit/credit columns in one vectorised pass.
+
+    Both inputs are float64 arrays with NaN for empty cells. A positive debit
+    wins over a credit on the same row (matching the per-row logic used for
+    PDF tables).
+
+    Returns (amounts, is_credit, keep) arrays aligned with the inputs.
+    """
+    debit = np.nan_to_num(debit, nan=0.0)
+    credit = np.nan_to_num(credit, nan=0.0)
+    is_debit = debit > 0
+    is_credit = ~is_debit & (credit > 0)
+    amounts = np.where(is_debit, debit, credit)
+    return amounts, is_credit, is_debit | is_credit
+
+
+# Column variant of _AMOUNT_CLEAN_RE that also drops ")" in the same pass
+_AMOUNT_COLUMN_CLEAN_RE = re.compile(r"[₹$,\s)]")
+
+# Plain decimals -- what almost every cleaned amount cell looks like
+_PLAIN_DECIMAL_RE = r"^-?(?:\d+\.?\d*|\.\d+)$"
+
+
+def _clean_amount_column(values: pd.Series) -> np.ndarray:
+    """Vectorised _clean_amount: float64 array with NaN for empty/unparseable cells."""
+    cleaned = (
+        values.astype(str)
+        .str.replace(_AMOUNT_COLUMN_CLEAN_RE, "", regex=True)
+        .str.replace("(", "-", regex=False)  # parentheses = negative
     )
+    return np.abs(_to_float_array(cleaned))
+
+
+def _to_float_array(strings: pd.Series) -> np.ndarray:
+    """pd.to_numeric(errors="coerce") as a float64 array.
+
+    With pyarrow available, plain decimals are converted by Arrow's cast
+    kernel; only the odd remaining non-empty cells (exponents, "inf",
+    garbage) go through pd.to_numeric.
+    """
+    if pc is None:
+        return pd.to_numeric(strings, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+    arr = pa.array(strings, type=pa.large_string(), from_pandas=True)
+    plain = pc.fill_null(pc.match_substring_regex(arr, _PLAIN_DECIMAL_RE), False)
+    out = pc.cast(pc.if_else(plain, arr, None), pa.float64()).to_numpy(zero_copy_only=False)
+
+    other = pc.fill_null(pc.and_(pc.invert(plain), pc.greater(pc.utf8_length(arr), 0)), False)
+    other = other.to_numpy(zero_copy_only=False)
+    if other.any():
+        out[other] = pd.to_numeric(strings[other], errors="coerce").to_numpy(
+            dtype=np.float64, na_value=np.nan,
+        )
+    return out
+
+
+def _parse_date_column(values: pd.Series) -> np.ndarray:
+    """Vectorised _parse_date: ISO strings (None where unparseable).
+
+    Each distinct value is parsed once. Formats are tried in DATE_FORMATS
+    order with pd.to_datetime, each pass only over values still unparsed,
+    so the result matches the row-by-row strptime loop.
+    """
+    codes, uniques = pd.factorize(values.astype(str).fillna("").str.strip())
+    text = pd.Series(uniques, dtype=object)
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[s]")
+    for fmt in DATE_FORMATS:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(text[missing], format=fmt, errors="coerce")
+
+    iso = parsed.dt.strftime("%Y-%m-%d").to_numpy(dtype=object, na_value=None)
+    return iso[codes]
 
 
 def _dataframe_to_transactions(df: pd.DataFrame, mapping: dict) -> list[dict]:
-    """Convert a DataFrame to a list of transaction dicts using the column mapping."""
-    transactions = []
+    """Convert a DataFrame to a list of transaction dicts using the column mapping.
 
-    for _, row in df.iterrows():
-        # Date
-        date_val = row.get(mapping["date"]) if mapping["date"] else None
-        parsed_date = _parse_date(str(date_val)) if date_val is not None else None
-        if parsed_date is None:
-            continue  # skip rows without a parseable date
+    All parsing runs column-wise; dicts are only built for rows that end up
+    as transactions.
+    """
+    if not mapping["date"]:
+        return []  # rows without a date are always skipped
+
+    # Amount and type
+    if mapping["debit"] and mapping["credit"]:
+        amounts, is_credit, keep = _classify_debit_credit(
+            _clean_amount_column(df[mapping["debit"]]),
+            _clean_amount_column(df[mapping["credit"]]),
+        )
+    elif mapping["amount"]:
+        amounts = _clean_amount_column(df[mapping["amount"]])
+        keep = np.nan_to_num(amounts, nan=0.0) > 0
+        # Heuristic: if amount is negative in original or description hints at credit
+        raw = df[mapping["amount"]].astype(str).fillna("").str.strip()
+        is_credit = (raw.str.startswith("-") | raw.str.lower().str.contains("cr", regex=False)).to_numpy(dtype=bool)
+    else:
+        return []
 
-        # Description
-        desc = str(row.get(mapping["description"], "")).strip() if mapping["description"] else ""
-        if not desc or desc == "nan":
-            desc = "No description"
+    # Date -- skip rows without a parseable date
+    dates = _parse_date_column(df[mapping["date"]])
+    keep &= pd.notna(dates)
 
-        # Amount and type
-        if mapping["debit"] and mapping["credit"]:
-            debit_amt = _clean_amount(row.get(mapping["debit"]))
-            credit_amt = _clean_amount(row.get(mapping["credit"]))
-            if debit_amt and debit_amt > 0:
-                transactions.append({"date": parsed_date, "description": desc, "amount": debit_amt, "type": "debit"})
-            elif credit_amt and credit_amt > 0:
-                transactions.append({"date": parsed_date, "description": desc, "amount": credit_amt, "type": "credit"})
-        elif mapping["amount"]:
-            amt = _clean_amount(row.get(mapping["amount"]))
-            if amt is not None and amt > 0:
-                # Heuristic: if amount is negative in original or description hints at credit
-                raw = str(row.get(mapping["amount"], ""))
-                txn_type = "credit" if raw.strip().startswith("-") or "cr" in raw.lower() else "debit"
-                transactions.append({"date": parsed_date, "description": desc, "amount": amt, "type": txn_type})
+    # Description
+    if mapping["description"]:
+        descs = df[mapping["description"]].astype(str).fillna("").str.strip()
+        descs = descs.mask(descs.isin(["", "nan"]), "No description").to_numpy(dtype=object)
+    else:
+        descs = np.full(len(df), "No description", dtype=object)
 
-    return transactions
+    kept = np.flatnonzero(keep)
+    return [
+        {"date": date, "description": desc, "amount": amount, "type": _CREDIT if credit else _DEBIT}
+        for date, desc, amount, credit in zip(
+            dates[kept], descs[kept], amounts[kept].tolist(), is_credit[kept].tolist(),
+        )
+    ]
 
 
 # ---------------------------------------------------------------------------
 # PDF parsing
 # ---------------------------------------------------------------------------
 
+# Ruled-table detection, pinned explicitly (bank PDFs draw cell borders)
+_PDF_TABLE_SETTINGS = {
+    "vertical_strategy": "lines",
+    "horizontal_strategy": "lines",
+    "snap_tolerance": 3,
+}
+
+
 def parse_pdf(file_bytes: bytes) -> list[dict]:
     """Extract transactions from a PDF bank / credit-card statement.
 
@@ -266,27 +525,44 @@ def parse_pdf(file_bytes: bytes) -> list[dict]:
     1. Try table extraction via pdfplumber (works for most structured PDFs).
     2. Fall back to line-by-line text parsing if no tables found.
     """
-    transactions: list[dict] = []
-
     with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-        # Attempt 1: table extraction
-        all_tables = []
-        for page in pdf.pages:
-            tables = page.extract_tables()
-            if tables:
-                all_tables.extend(tables)
+        # Single pass over the pages: tables everywhere, and text for pages
+        # without tables while their characters are already parsed.
+        extracted = [_extract_page(page) for page in pdf.pages]
 
-        if all_tables:
-            transactions = _parse_pdf_tables(all_tables)
+        # Attempt 1: table extraction (already parsed page by page)
+        transactions = [txn for page_txns, _ in extracted for txn in page_txns]
+        page_texts = [text for _, text in extracted]
 
         # Attempt 2: line-by-line fallback
         if not transactions:
-            full_text = "\n".join(page.extract_text() or "" for page in pdf.pages)
+            full_text = "\n".join(
+                text if text is not None else (page.extract_text() or "")
+                for page, text in zip(pdf.pages, page_texts)
+            )
             transactions = _parse_pdf_text(full_text)
 
     return transactions
 
 
+def _extract_page(page) -> tuple[list[dict], Optional[str]]:
+    """Return (table transactions, text) for one page.
+
+    Tables are parsed as soon as they are extracted and the page's parsed
+    objects are released, so peak memory stays at about one page. Text is
+    None when the page had tables.
+    """
+    try:
+        # The "lines" strategy builds tables from ruling edges only, so
+        # pages without any (plain-text statements) skip table detection.
+        tables = page.extract_tables(table_settings=_PDF_TABLE_SETTINGS) if page.edges else []
+        if tables:
+            return _parse_pdf_tables(tables), None  # text only needed if table parsing fails
+        return [], page.extract_text() or ""
+    finally:
+        page.close()
+
+
 def _parse_pdf_tables(tables: list[list]) -> list[dict]:
     """Parse transactions from extracted PDF tables."""
     transactions = []
@@ -299,76 +575,101 @@ def _parse_pdf_tables(tables: list[list]) -> list[dict]:
         header = [str(c).strip().lower() if c else "" for c in table[0]]
 
         # Detect column indices
-        date_idx = _find_index(header, _DATE_KEYWORDS)
-        desc_idx = _find_index(header, _DESC_KEYWORDS)
-        debit_idx = _find_index(header, _DEBIT_KEYWORDS)
-        credit_idx = _find_index(header, _CREDIT_KEYWORDS)
-        amount_idx = _find_index(header, _AMOUNT_KEYWORDS)
+        date_idx = _find_index(header, _DATE_KW_RE)
+        desc_idx = _find_index(header, _DESC_KW_RE)
+        debit_idx = _find_index(header, _DEBIT_KW_RE)
+        credit_idx = _find_index(header, _CREDIT_KW_RE)
+        amount_idx = _find_index(header, _AMOUNT_KW_RE)
 
         if date_idx is None:
             continue
 
-        for row in table[1:]:
-            if not row or len(row) <= date_idx:
-                continue
-
-            date_val = _parse_date(str(row[date_idx] or ""))
-            if date_val is None:
-                continue
-
-            desc = str(row[desc_idx]).strip() if desc_idx is not None and desc_idx < len(row) else "No description"
-            if desc == "None" or desc == "nan":
-                desc = "No description"
-
-            if debit_idx is not None and credit_idx is not None:
-                debit_amt = _clean_amount(row[debit_idx]) if debit_idx < len(row) else None
-                credit_amt = _clean_amount(row[credit_idx]) if credit_idx < len(row) else None
-                if debit_amt and debit_amt > 0:
-                    transactions.append({"date": date_val, "description": desc, "amount": debit_amt, "type": "debit"})
-                elif credit_amt and credit_amt > 0:
-                    transactions.append({"date": date_val, "description": desc, "amount": credit_amt, "type": "credit"})
-            elif amount_idx is not None and amount_idx < len(row):
-                amt = _clean_amount(row[amount_idx])
-                if amt and amt > 0:
-                    raw = str(row[amount_idx] or "")
-                    txn_type = "credit" if "-" in raw or "cr" in raw.lower() else "debit"
-                    transactions.append({"date": date_val, "description": desc, "amount": amt, "type": txn_type})
+        mk = _pdf_row_to_txn
+        transactions.extend([
+            txn for row in table[1:]
+            if (txn := mk(row, date_idx, desc_idx, debit_idx, credit_idx, amount_idx)) is not None
+        ])
 
     return transactions
 
 
-def _find_index(header: list[str], keywords: set[str]) -> Optional[int]:
-    """Find the first column index that matches any keyword."""
+def _pdf_row_to_txn(
+    row: list,
+    date_idx: int,
+    desc_idx: Optional[int],
+    debit_idx: Optional[int],
+    credit_idx: Optional[int],
+    amount_idx: Optional[int],
+) -> Optional[dict]:
+    """Convert one PDF table row to a transaction dict, or None to skip it."""
+    if not row or len(row) <= date_idx:
+        return None
+
+    date_val = _parse_date(str(row[date_idx] or ""))
+    if date_val is None:
+        return None
+
+    desc = str(row[desc_idx]).strip() if desc_idx is not None and desc_idx < len(row) else "No description"
+    if desc == "None" or desc == "nan":
+        desc = "No description"
+
+    if debit_idx is not None and credit_idx is not None:
+        debit_amt = _clean_amount(row[debit_idx]) if debit_idx < len(row) else None
+        credit_amt = _clean_amount(row[credit_idx]) if credit_idx < len(row) else None
+        if debit_amt and debit_amt > 0:
+            return {"date": date_val, "description": desc, "amount": debit_amt, "type": _DEBIT}
+        if credit_amt and credit_amt > 0:
+            return {"date": date_val, "description": desc, "amount": credit_amt, "type": _CREDIT}
+    elif amount_idx is not None and amount_idx < len(row):
+        amt = _clean_amount(row[amount_idx])
+        if amt and amt > 0:
+            raw = str(row[amount_idx] or "")
+            txn_type = _CREDIT if "-" in raw or "cr" in raw.lower() else _DEBIT
+            return {"date": date_val, "description": desc, "amount": amt, "type": txn_type}
+    return None
+
+
+def _find_index(header: list[str], keywords: re.Pattern) -> Optional[int]:
+    """Find the first column index that matches any keyword.
+
+    `header` entries must already be stripped and lowercased.
+    """
     for i, col in enumerate(header):
         if _match_column(col, keywords):
             return i
     return None
 
 
+# Pattern: date  description  amount (possibly with Cr/Dr suffix), one per line.
+# [^\S\n] is "whitespace except newline" so a match never spans lines.
+_PDF_LINE_RE = re.compile(
+    r"(?m)(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})[^\S\n]+(.+?)[^\S\n]+([\d,]+\.?\d*)"
+    r"[^\S\n]*(Cr|Dr|CR|DR)?[^\S\n]*$"
+)
+
+
 def _parse_pdf_text(text: str) -> list[dict]:
     """Fallback: parse transactions from raw PDF text line by line.
 
     Looks for lines that start with a date pattern followed by description and amount.
     """
     transactions = []
-    # Pattern: date  description  amount (possibly with Cr/Dr suffix)
-    line_pattern = re.compile(
-        r"(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\s+(.+?)\s+([\d,]+\.?\d*)\s*(Cr|Dr|CR|DR)?$"
-    )
 
-    for line in text.split("\n"):
-        line = line.strip()
-        match = line_pattern.search(line)
-        if match:
-            date_str, desc, amount_str, dr_cr = match.groups()
-            parsed_date = _parse_date(date_str)
-            if parsed_date is None:
-                continue
-            amt = _clean_amount(amount_str)
-            if amt is None or amt == 0:
-                continue
-            txn_type = "credit" if dr_cr and dr_cr.upper() == "CR" else "debit"
-            transactions.append({"date": parsed_date, "description": desc.strip(), "amount": amt, "type": txn_type})
+    for match in _PDF_LINE_RE.finditer(text):
+        date_str, desc, amount_str, dr_cr = match.groups()
+        parsed_date = _parse_date(date_str)
+        if parsed_date is None:
+            continue
+        # The pattern only admits digits, commas and a dot, so the general
+        # _clean_amount() (currency symbols, parentheses, sign) isn't needed.
+        try:
+            amt = float(amount_str.replace(",", ""))
+        except ValueError:
+            continue
+        if amt == 0:
+            continue
+        txn_type = _CREDIT if dr_cr in ("Cr", "CR") else _DEBIT
+        transactions.append({"date": parsed_date, "description": desc.strip(), "amount": amt, "type": txn_type})
 
     return transactions
 
@@ -380,17 +681,38 @@ def _parse_pdf_text(text: str) -> list[dict]:
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_VISION_MODEL = os.getenv("OLLAMA_VISION_MODEL", "llama3.2-vision")
 
+# Shared session so repeated uploads reuse keep-alive connections to Ollama
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Successful vision-model probes are reused for this many seconds
+_VISION_CHECK_TTL = 60.0
+_vision_check_cache: Optional[tuple[float, str]] = None
+
 
 def _check_vision_model() -> tuple[bool, str]:
-    """Check if the Ollama vision model is available. Returns (ok, message)."""
+    """Check if the Ollama vision model is available. Returns (ok, message).
+
+    A successful result is cached for _VISION_CHECK_TTL seconds so that
+    back-to-back uploads skip the /api/tags probe. Failures are never cached,
+    so starting Ollama takes effect on the next upload.
+    """
+    global _vision_check_cache
+    if _vision_check_cache is not None:
+        checked_at, model_name = _vision_check_cache
+        if time.monotonic() - checked_at < _VISION_CHECK_TTL:
+            return True, model_name
+
     try:
-        resp = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
+        resp = _SESSION.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
         if resp.status_code != 200:
             return False, "Ollama is not responding."
         models = [m["name"] for m in resp.json().get("models", [])]
         # Check for the configured vision model or common variants
         for m in models:
             if OLLAMA_VISION_MODEL in m:
+                _vision_check_cache = (time.monotonic(), m)
                 return True, m
         return False, (
             f"Vision model '{OLLAMA_VISION_MODEL}' not found. "
@@ -435,15 +757,16 @@ Example output:
 """
 
     try:
-        resp = requests.post(
+        resp = _SESSION.post(
             f"{OLLAMA_BASE_URL}/api/generate",
-            json={
+            data=_json_dumps({
                 "model": OLLAMA_VISION_MODEL,
                 "prompt": prompt,
                 "images": [b64_image],
                 "stream": False,
                 "options": {"temperature": 0.1, "num_predict": 4096},
-            },
+            }),
+            headers={"Content-Type": "application/json"},
             timeout=180,
         )
 
@@ -451,7 +774,7 @@ Example output:
             error_text = resp.text[:300]
             raise RuntimeError(f"Ollama vision error ({resp.status_code}): {error_text}")
 
-        text = resp.json().get("response", "").strip()
+        text = _json_loads(resp.content).get("response", "").strip()
         return _parse_vision_response(text)
 
     except requests.ConnectionError:
@@ -480,7 +803,7 @@ def _parse_vision_response(text: str) -> list[dict]:
         return []
 
     try:
-        raw_list = json.loads(cleaned[start : end + 1])
+        raw_list = _json_loads(cleaned[start : end + 1])
     except json.JSONDecodeError:
         logger.warning("Invalid JSON from vision model: %s", cleaned[:200])
         return []
@@ -503,9 +826,7 @@ def _parse_vision_response(text: str) -> list[dict]:
         if not amt or amt <= 0:
             continue
 
-        txn_type = str(item.get("type", "debit")).lower()
-        if txn_type not in ("debit", "credit"):
-            txn_type = "debit"
+        txn_type = _CREDIT if str(item.get("type", _DEBIT)).lower() == _CREDIT else _DEBIT
 
         transactions.append({
             "date": parsed_date,
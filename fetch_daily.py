@@ -16,6 +16,8 @@ from datetime import datetime
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Ensure the project root is on the path
 sys.path.insert(0, os.path.dirname(__file__))
@@ -24,7 +26,7 @@ load_dotenv()
 from core.database import (
     get_setting,
     init_db,
-    insert_transactions,
+    insert_transactions_returning_ids,
     get_all_categories,
     get_transactions,
     find_duplicate_transactions,
@@ -49,6 +51,20 @@ _EMAIL_CONFIG_KEY = "email_sync_config"
 NTFY_TOPIC = os.getenv("NTFY_TOPIC", "")
 NTFY_SERVER = os.getenv("NTFY_SERVER", "https://ntfy.sh")
 
+# Shared session for ntfy: keep-alive connections plus retry with backoff on
+# transient failures (POST isn't retried by urllib3 unless allowed explicitly)
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "expense-tracker-cron"})
+_RETRY = Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=[429, 502, 503, 504],
+    allowed_methods=frozenset({"POST"}),
+    raise_on_status=False,
+)
+_SESSION.mount("https://", HTTPAdapter(max_retries=_RETRY))
+_SESSION.mount("http://", HTTPAdapter(max_retries=_RETRY))
+
 
 def _get_email_config() -> dict:
     """Load email config from the database settings table."""
@@ -74,7 +90,7 @@ def _send_notification(title: str, message: str, url: str = ""):
         headers["Actions"] = f"view, Review Transactions, {url}"
 
     try:
-        resp = requests.post(
+        resp = _SESSION.post(
             f"{NTFY_SERVER}/{NTFY_TOPIC}",
             data=message.encode("utf-8"),
             headers=headers,
@@ -171,22 +187,27 @@ def main():
         })
 
     # Save
-    count = insert_transactions(rows)
-    logger.info("Saved %d transaction(s) to database.", count)
+    new_ids = set(insert_transactions_returning_ids(rows))
+    logger.info("Saved %d transaction(s) to database.", len(new_ids))
 
-    # CC payment detection
-    saved_txns = get_transactions(month=month, year=year, source="bank",
+    # One read of the month's email transactions serves CC detection,
+    # categorization and the summary; later DB writes are mirrored in memory.
+    month_txns = get_transactions(month=month, year=year,
                                   include_excluded=True, email_only=True)
-    flagged_ids = detect_cc_payments(saved_txns)
+
+    # CC payment detection
+    flagged_ids = detect_cc_payments([t for t in month_txns if t["source"] == "bank"])
     if flagged_ids:
         flag_cc_payments_visible(flagged_ids)
         logger.info("Flagged %d CC payment(s).", len(flagged_ids))
+        flagged = set(flagged_ids)
+        for t in month_txns:
+            if t["id"] in flagged:
+                t.update(is_cc_payment=1, is_excluded=1, category="Credit Card Payment")
 
     # Categorize
-    saved_txns = get_transactions(month=month, year=year, email_only=True)
-    uncategorized = [t for t in saved_txns if not t.get("category")]
+    uncategorized = [t for t in month_txns if not t["is_excluded"] and not t.get("category")]
 
-    cat_summary = {}
     if uncategorized:
         logger.info("Categorizing %d uncategorized transaction(s)...", len(uncategorized))
         try:
@@ -196,39 +217,20 @@ def main():
                 from core.database import bulk_update_categories
                 bulk_update_categories(results)
                 logger.info("Categorized %d transaction(s).", len(results))
+                for t in month_txns:
+                    if t["id"] in results:
+                        t["category"] = results[t["id"]]
         except Exception as e:
             logger.warning("Categorization failed: %s", e)
 
-    # Build summary for notification
-    # Re-fetch to get final categories
-    final_txns = get_transactions(month=month, year=year, email_only=True)
-    # Only count today's new ones
-    new_ids = set()
-    for t in final_txns:
-        if t.get("uploaded_file") == uploaded_file:
-            new_ids.add(t["id"])
-
-    today_txns = [t for t in final_txns if t["id"] in new_ids or t.get("date") == now.strftime("%Y-%m-%d")]
-
-    # Category summary
-    for t in new_txns:
-        # Re-read from DB to get assigned category
-        pass
-
-    # Simple summary from what we saved
+    # Summary of the just-saved transactions
+    total_amount = sum(t["amount"] for t in rows)
     cat_counts = {}
-    total_amount = 0
-    uncat_count = 0
-    for t in rows:
-        total_amount += t["amount"]
-
-    # Re-fetch the just-saved transactions for their categories
-    recent = get_transactions(month=month, year=year, email_only=True)
-    for t in recent[-len(rows):]:
-        cat = t.get("category") or "Uncategorized"
-        cat_counts[cat] = cat_counts.get(cat, 0) + 1
-        if cat == "Uncategorized":
-            uncat_count += 1
+    for t in month_txns:
+        if t["id"] in new_ids:
+            cat = t.get("category") or "Uncategorized"
+            cat_counts[cat] = cat_counts.get(cat, 0) + 1
+    uncat_count = cat_counts.get("Uncategorized", 0)
 
     # Format notification
     summary_parts = [f"{cnt}x {cat}" for cat, cnt in sorted(cat_counts.items(), key=lambda x: -x[1])]
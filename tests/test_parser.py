@@ -0,0 +1,52 @@
+"""Regression tests for CSV statement parsing."""
+
+import pytest
+
+from core.parser import parse_csv, parse_csv_from_path
+
+_TABLE = (
+    b"Date,Description,Debit,Credit\n"
+    b"01/03/2026,SWIGGY,100.00,\n"
+    b"02/03/2026,SALARY,,5000.00\n"
+)
+
+_EXPECTED = [("2026-03-01", 100.0, "debit"), ("2026-03-02", 5000.0, "credit")]
+
+
+@pytest.fixture(params=["bytes", "path"])
+def parse(request, tmp_path):
+    """Run parse_csv on bytes, or parse_csv_from_path on the same data written to disk."""
+    def _parse(data: bytes) -> tuple[list[dict], dict]:
+        if request.param == "bytes":
+            return parse_csv(data, "statement.csv")
+        path = tmp_path / "statement.csv"
+        path.write_bytes(data)
+        return parse_csv_from_path(str(path))
+    return _parse
+
+
+def _summary(transactions: list[dict]) -> list[tuple]:
+    return [(t["date"], t["amount"], t["type"]) for t in transactions]
+
+
+def test_preamble_with_multiline_quoted_field(parse):
+    data = b'Account Holder,"MR X\nFLAT 1, ROAD 2\nMUMBAI"\nAccount No,123\n' + _TABLE
+    transactions, mapping = parse(data)
+    assert mapping["date"] == "Date"
+    assert _summary(transactions) == _EXPECTED
+
+
+def test_preamble_with_unbalanced_quote(parse):
+    transactions, _ = parse(b'Note,"unterminated\n' + _TABLE)
+    assert _summary(transactions) == _EXPECTED
+
+
+def test_preamble_with_crlf_line_endings(parse):
+    data = (b'Account Holder,"MR X\nFLAT 1"\n' + _TABLE).replace(b"\n", b"\r\n")
+    transactions, _ = parse(data)
+    assert _summary(transactions) == _EXPECTED
+
+
+def test_no_preamble(parse):
+    transactions, _ = parse(_TABLE)
+    assert _summary(transactions) == _EXPECTED
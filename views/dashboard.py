@@ -1,20 +1,56 @@
 """Dashboard page -- monthly summary, category breakdown, trends."""
 
+import html
+from calendar import month_abbr, month_name
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
+from plotly.subplots import make_subplots
 from typing import Optional
 
 from core.database import (
     get_available_months,
     get_monthly_summary,
+    get_monthly_summary_bulk,
     get_category_breakdown,
-    get_transactions,
+    get_top_expenses,
 )
 
 
+# ---------------------------------------------------------------------------
+# Cached DB reads -- every widget interaction reruns the page, so repeated
+# reads are served from memory. Views that write transactions clear the
+# cache; the TTL bounds staleness from writes made by fetch_daily.py.
+# ---------------------------------------------------------------------------
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_available_months(email_only: Optional[bool]) -> list[tuple[int, int]]:
+    return get_available_months(email_only=email_only)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_monthly_summary(month: int, year: int, email_only: Optional[bool]) -> dict:
+    return get_monthly_summary(month, year, email_only=email_only)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_monthly_summary_bulk(email_only: Optional[bool]) -> list[dict]:
+    return get_monthly_summary_bulk(email_only=email_only)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_category_breakdown(month: int, year: int, email_only: Optional[bool]) -> list[dict]:
+    return get_category_breakdown(month, year, email_only=email_only)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_top_expenses(month: int, year: int, email_only: Optional[bool]) -> list[dict]:
+    return get_top_expenses(month, year, limit=10, email_only=email_only)
+
+
 def _fmt_inr(amount: float) -> str:
     """Format amount in Indian short form: ₹1.91L, ₹50K, ₹771."""
     if amount >= 1_00_000:
@@ -24,6 +60,36 @@ def _fmt_inr(amount: float) -> str:
     return f"₹{amount:,.0f}"
 
 
+def _fmt_inr_series(amounts: pd.Series) -> list[str]:
+    """Vectorised _fmt_inr(): buckets and scaling are chosen with numpy masks."""
+    arr = amounts.to_numpy(dtype=float)
+    lakh = arr >= 1_00_000
+    thousand = ~lakh & (arr >= 1_000)
+    scaled = np.select([lakh, thousand], [arr / 1_00_000, arr / 1_000], arr)
+    fmts = np.select([lakh, thousand], ["₹{:.2f}L", "₹{:.1f}K"], "₹{:,.0f}")
+    return [fmt.format(v) for fmt, v in zip(fmts.tolist(), scaled.tolist())]
+
+
+# Amounts stay numeric in tables; the browser formats them
+_AMOUNT_COLUMN = {"Amount": st.column_config.NumberColumn(format="₹%.2f")}
+
+# Debit categories that move money rather than spend it
+_NON_SPEND_CATEGORIES = ["Investment", "Transfer", "Credit Card Payment"]
+
+
+def _compute_flows(credits, debits, investment, transfer_in, transfer_out):
+    """Return (earnings, expenses, savings) for scalars or aligned Series.
+
+    Earnings = credits minus transfers in (real income only).
+    Expenses = debits minus investments minus all transfers out, plus the
+    net transfer deficit when more went out than came in.
+    """
+    earnings = credits - transfer_in
+    transfer_deficit = np.maximum(transfer_out - transfer_in, 0)
+    expenses = debits - investment - transfer_out + transfer_deficit
+    return earnings, expenses, earnings - expenses
+
+
 _CATEGORY_ICONS = {
     # Expenditure categories
     "Food": "🍽️", "Groceries": "🛒", "Rent": "🏠", "Utilities": "💡",
@@ -38,79 +104,112 @@ _CATEGORY_ICONS = {
 }
 
 
-def _render_donut_card(
-    df: pd.DataFrame,
-    name_col: str,
-    value_col: str,
-    total: float,
-    center_label: str,
-    center_value: str,
-    colors=None,
-    color_map: Optional[dict] = None,
-):
-    """Render a donut chart with center summary and a compact single-column legend."""
-    # Build the donut
-    if color_map:
-        used_colors = [color_map.get(n, "#999") for n in df[name_col]]
-    else:
-        color_seq = colors or px.colors.qualitative.Vivid
-        used_colors = color_seq[:len(df)]
+# Layouts are built (and validated by Plotly) once at import; figures only
+# add their traces and, for donuts, the center annotation
+_DONUT_LAYOUT = go.Layout(
+    showlegend=False,
+    margin=dict(t=10, b=10, l=10, r=10),
+    height=320,
+    paper_bgcolor="rgba(0,0,0,0)",
+    plot_bgcolor="rgba(0,0,0,0)",
+)
 
-    fig = go.Figure(go.Pie(
-        labels=df[name_col],
-        values=df[value_col],
+_TREND_LAYOUT = go.Layout(
+    barmode="group",
+    xaxis_title="",
+    yaxis_title="Amount (₹)",
+    legend=dict(orientation="h", y=1.1),
+    margin=dict(t=40, b=20, l=20, r=20),
+    height=400,
+)
+
+
+def _add_donut_trace(
+    fig: go.Figure, row: int, col: int,
+    labels: tuple, values: tuple, colors: tuple,
+    center_label: str, center_value: str,
+):
+    """Add a donut and its center annotation to one subplot cell of ``fig``."""
+    fig.add_trace(go.Pie(
+        labels=list(labels),
+        values=list(values),
         hole=0.6,
-        marker=dict(colors=used_colors),
+        marker=dict(colors=list(colors)),
         textinfo="none",
         hovertemplate="%{label}: ₹%{value:,.0f} (%{percent})<extra></extra>",
         direction="clockwise",
         sort=False,
         rotation=90,
-    ))
+    ), row=row, col=col)
 
+    # Center the annotation on the cell's domain rather than the whole figure
+    x0, x1 = fig.data[-1].domain.x
     fig.add_annotation(
         text=(
             f"<span style='font-size:12px; color:#888;'>{center_label}</span>"
             f"<br><br>"
             f"<span style='font-size:24px; color:#000; font-weight:bold;'>{center_value}</span>"
         ),
-        x=0.5, y=0.5, showarrow=False,
+        x=(x0 + x1) / 2, y=0.5, xref="paper", yref="paper", showarrow=False,
         font=dict(size=13),
     )
 
-    fig.update_layout(
-        showlegend=False,
-        margin=dict(t=10, b=10, l=10, r=10),
-        height=320,
-        paper_bgcolor="rgba(0,0,0,0)",
-        plot_bgcolor="rgba(0,0,0,0)",
-    )
 
-    # Layout: donut left, single-column legend right
-    col_chart, col_legend = st.columns([1, 1.2])
-
-    with col_chart:
-        st.plotly_chart(fig, use_container_width=True)
-
-    with col_legend:
-        # Build all legend rows as a single HTML block for compact rendering
-        legend_html = '<div style="padding-top: 10px; line-height: 2.2;">'
-        for i, (_, row) in enumerate(df.iterrows()):
-            name = row[name_col]
-            val = row[value_col]
-            pct = (val / total * 100) if total else 0
-            dot_color = used_colors[i] if i < len(used_colors) else "#999"
-            icon = _CATEGORY_ICONS.get(name, "•")
-            legend_html += (
-                f'<div style="white-space: nowrap;">'
-                f'<span style="color:{dot_color}; font-size:14px;">&#9679;</span> '
-                f'{icon} <b>{name}</b>'
-                f'<span style="float:right; font-size:14px;">'
-                f'{_fmt_inr(val)} &nbsp;({pct:.1f}%)</span>'
-                f'</div>'
-            )
-        legend_html += '</div>'
-        st.markdown(legend_html, unsafe_allow_html=True)
+# Figures are cached by the values they plot, so reruns caused by unrelated
+# widgets reuse the built figure; st.plotly_chart only reads it.
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _build_donuts_fig(spend: Optional[tuple], flow: Optional[tuple]) -> go.Figure:
+    """Build both month donuts side by side in a single figure.
+
+    Each argument is ``(labels, values, colors, center_label, center_value)``,
+    or None to leave that cell empty. One figure means one Plotly instance
+    in the browser instead of two.
+    """
+    fig = make_subplots(rows=1, cols=2, specs=[[{"type": "domain"}, {"type": "domain"}]])
+    fig.update_layout(_DONUT_LAYOUT)
+    for col, donut in enumerate((spend, flow), start=1):
+        if donut is not None:
+            _add_donut_trace(fig, 1, col, *donut)
+    return fig
+
+
+def _donut_colors(
+    df: pd.DataFrame, name_col: str, colors=None, color_map: Optional[dict] = None,
+) -> list[str]:
+    """Pick slice colors from ``color_map`` by name, else from a color sequence."""
+    if color_map:
+        return [color_map.get(n, "#999") for n in df[name_col]]
+    color_seq = colors or px.colors.qualitative.Vivid
+    return color_seq[:len(df)]
+
+
+def _render_donut_legend(
+    df: pd.DataFrame,
+    name_col: str,
+    value_col: str,
+    total: float,
+    used_colors: list[str],
+):
+    """Render a compact single-column legend matching a donut's slices."""
+    # Build all legend rows as a single HTML block for compact rendering
+    parts = ['<div style="padding-top: 10px; line-height: 2.2;">']
+    names = df[name_col].tolist()
+    amount_labels = _fmt_inr_series(df[value_col])
+    pcts = (df[value_col].to_numpy(dtype=float) / total * 100).tolist() if total else [0] * len(names)
+    icons = [_CATEGORY_ICONS.get(name, "•") for name in names]
+    for i, (name, pct, icon) in enumerate(zip(names, pcts, icons)):
+        dot_color = used_colors[i] if i < len(used_colors) else "#999"
+        parts.append(
+            f'<div style="white-space: nowrap;">'
+            f'<span style="color:{dot_color}; font-size:14px;">&#9679;</span> '
+            f'{icon} <b>{html.escape(str(name))}</b>'
+            f'<span style="float:right; font-size:14px;">'
+            f'{amount_labels[i]} &nbsp;({pct:.1f}%)</span>'
+            f'</div>'
+        )
+    parts.append('</div>')
+    legend_html = "".join(parts)
+    st.markdown(legend_html, unsafe_allow_html=True)
 
 
 def render(email_only: Optional[bool] = None):
@@ -120,7 +219,7 @@ def render(email_only: Optional[bool] = None):
 
     st.header(f"Dashboard — {section_label}")
 
-    available = get_available_months(email_only=email_only)
+    available = _cached_available_months(email_only)
     if not available:
         if email_only:
             st.info("No email data yet. Sync your email in the Email Sync page to see your dashboard.")
@@ -128,30 +227,49 @@ def render(email_only: Optional[bool] = None):
             st.info("No data yet. Upload a statement to see your dashboard.")
         return
 
+    _render_month_view(available, email_only, pfx)
+
+    # --- Month-over-month trend (independent of the selected month) ---
+    if len(available) > 1:
+        st.divider()
+        st.subheader("Month-over-Month Trend")
+        _render_trend(available, email_only=email_only, key=f"{pfx}trend")
+
+
+@st.fragment
+def _render_month_view(
+    available: list[tuple[int, int]], email_only: Optional[bool], pfx: str,
+):
+    """Render everything that depends on the selected month.
+
+    Runs as a fragment, so changing the month reruns only this block and
+    not the trend chart below it.
+    """
     # --- Month selector ---
-    month_options = [f"{datetime(y, m, 1).strftime('%B %Y')}" for y, m in available]
-    selected = st.selectbox("Select Month", month_options, key=f"{pfx}month_sel")
-    idx = month_options.index(selected)
-    sel_year, sel_month = available[idx]
+    sel_year, sel_month = st.selectbox(
+        "Select Month", available,
+        format_func=lambda ym: f"{month_name[ym[1]]} {ym[0]}",
+        key=f"{pfx}month_sel",
+    )
 
     # --- Summary cards ---
-    summary = get_monthly_summary(sel_month, sel_year, email_only=email_only)
-    all_credits = summary["total_earnings"]
-    all_debits = summary["total_expenses"]
+    summary = _cached_monthly_summary(sel_month, sel_year, email_only)
+    if not summary["total_earnings"] and not summary["total_expenses"]:
+        # Every transaction this month is excluded: skip the cards, charts and
+        # the breakdown / top-10 queries, which would all come back empty
+        st.info(
+            f"All transactions in {month_name[sel_month]} {sel_year} are excluded from totals."
+        )
+        return
+
     transfer_in = summary["transfer_in"]
     transfer_out = summary["transfer_out"]
     investment = summary["investment"]
-
-    # Earnings = credits minus transfers in (real income only)
-    earnings = all_credits - transfer_in
-
-    # Net transfers: if negative (more going out), the deficit is an expense
     net_transfer = transfer_in - transfer_out
-    transfer_expense = abs(net_transfer) if net_transfer < 0 else 0
-
-    # Expenses = debits minus investments minus all transfers + net transfer deficit
-    expenses = all_debits - investment - transfer_out + transfer_expense
-    savings = earnings - expenses
+    earnings, expenses, savings = _compute_flows(
+        summary["total_earnings"], summary["total_expenses"],
+        investment, transfer_in, transfer_out,
+    )
 
     c1, c2, c3 = st.columns(3)
     c1.metric("Total Earnings", f"₹{_fmt_inr(earnings)}",
@@ -177,49 +295,39 @@ def render(email_only: Optional[bool] = None):
 
     st.divider()
 
-    # --- Two charts stacked vertically ---
-    breakdown = get_category_breakdown(sel_month, sel_year, email_only=email_only)
+    # --- Two donuts side by side, drawn as one figure ---
+    # One frame serves the spend donut (masked) and the detail table
+    breakdown_df = pd.DataFrame(
+        _cached_category_breakdown(sel_month, sel_year, email_only),
+        columns=["category", "total"],
+    )
 
-    # ---- Chart 1: Expenditure Breakdown ----
-    st.subheader("Expenditure Breakdown")
-
-    if breakdown:
-        _EXCLUDE = {"Investment", "Transfer", "Credit Card Payment"}
-        spend_rows = [r for r in breakdown if r["category"] not in _EXCLUDE]
-
-        if spend_rows:
-            spend_df = pd.DataFrame(spend_rows)
-            spend_total = spend_df["total"].sum()
-            _render_donut_card(
-                spend_df, "category", "total", spend_total,
-                "Total Expenditure", _fmt_inr(spend_total),
-                px.colors.qualitative.Vivid,
-            )
-        else:
-            st.info("No spending transactions for this month.")
-    else:
-        st.info("No expense data for this month.")
+    col_spend, col_flow = st.columns(2)
+    col_spend.subheader("Expenditure Breakdown")
+    col_flow.subheader("Money Flow Overview")
 
-    st.divider()
+    # ---- Chart 1: Expenditure Breakdown ----
+    spend_df = breakdown_df[~breakdown_df["category"].isin(_NON_SPEND_CATEGORIES)]
+    spend = None
+    if not spend_df.empty:
+        spend_total = spend_df["total"].sum()
+        spend_colors = _donut_colors(spend_df, "category", px.colors.qualitative.Vivid)
+        spend = (
+            tuple(spend_df["category"].tolist()), tuple(spend_df["total"].tolist()),
+            tuple(spend_colors), "Total Expenditure", _fmt_inr(spend_total),
+        )
 
     # ---- Chart 2: Money Flow Overview ----
-    st.subheader("Money Flow Overview")
-
     net_transfer_abs = abs(net_transfer)
     net_transfer_label = "Net Transfer In" if net_transfer >= 0 else "Net Transfer Out"
 
-    broad_data = []
-    if earnings > 0:
-        broad_data.append({"Category": "Earnings", "Amount": earnings})
-    if expenses > 0:
-        broad_data.append({"Category": "Expenditure", "Amount": expenses})
-    if investment > 0:
-        broad_data.append({"Category": "Invested", "Amount": investment})
-    if net_transfer_abs > 0:
-        broad_data.append({"Category": net_transfer_label, "Amount": net_transfer_abs})
-
-    if broad_data:
-        broad_df = pd.DataFrame(broad_data)
+    broad_df = pd.DataFrame({
+        "Category": ["Earnings", "Expenditure", "Invested", net_transfer_label],
+        "Amount": [earnings, expenses, investment, net_transfer_abs],
+    })
+    broad_df = broad_df[broad_df["Amount"] > 0]
+    flow = None
+    if not broad_df.empty:
         broad_total = broad_df["Amount"].sum()
         color_map = {
             "Earnings": "#2ecc71",
@@ -228,44 +336,54 @@ def render(email_only: Optional[bool] = None):
             "Net Transfer In": "#27ae60",
             "Net Transfer Out": "#7f8c8d",
         }
-        _render_donut_card(
-            broad_df, "Category", "Amount", broad_total,
-            "Total", _fmt_inr(broad_total),
-            color_map=color_map,
+        flow_colors = _donut_colors(broad_df, "Category", color_map=color_map)
+        flow = (
+            tuple(broad_df["Category"].tolist()), tuple(broad_df["Amount"].tolist()),
+            tuple(flow_colors), "Total", _fmt_inr(broad_total),
+        )
+
+    # A stable key keeps the chart's frontend component mounted across
+    # reruns, so a month change updates its traces instead of remounting it.
+    if spend or flow:
+        st.plotly_chart(
+            _build_donuts_fig(spend, flow), use_container_width=True, key=f"{pfx}donuts",
         )
-    else:
-        st.info("No data to display.")
 
-    # Detailed category table
-    if breakdown:
+    legend_spend, legend_flow = st.columns(2)
+    with legend_spend:
+        if spend:
+            _render_donut_legend(spend_df, "category", "total", spend_total, spend_colors)
+        elif not breakdown_df.empty:
+            st.info("No spending transactions for this month.")
+        else:
+            st.info("No expense data for this month.")
+    with legend_flow:
+        if flow:
+            _render_donut_legend(broad_df, "Category", "Amount", broad_total, flow_colors)
+        else:
+            st.info("No data to display.")
+
+    # Detailed category table -- built and sent only once its toggle is on,
+    # since a plain expander's contents are rendered even while collapsed
+    if not breakdown_df.empty:
         with st.expander("Detailed category breakdown"):
-            bd_df = pd.DataFrame(breakdown)
-            bd_df["total"] = bd_df["total"].map(lambda x: f"₹{x:,.2f}")
-            bd_df.columns = ["Category", "Amount"]
-            bd_df.index = range(1, len(bd_df) + 1)
-            st.dataframe(bd_df, use_container_width=True)
+            if st.toggle("Show table", key=f"{pfx}bd_show"):
+                bd_df = breakdown_df.set_axis(["Category", "Amount"], axis=1)
+                bd_df.index = range(1, len(bd_df) + 1)
+                st.dataframe(bd_df, use_container_width=True, column_config=_AMOUNT_COLUMN)
 
     st.divider()
 
-    # --- Month-over-month trend ---
-    if len(available) > 1:
-        st.subheader("Month-over-Month Trend")
-        _render_trend(available, email_only=email_only)
-
     # --- Top expenses ---
     st.subheader("Top 10 Expenses")
-    txns = get_transactions(month=sel_month, year=sel_year, email_only=email_only)
-    debits = [t for t in txns if t["type"] == "debit"]
-    debits.sort(key=lambda t: t["amount"], reverse=True)
-    top_10 = debits[:10]
+    top_10 = _cached_top_expenses(sel_month, sel_year, email_only)
 
     if top_10:
-        top_df = pd.DataFrame(top_10)[["date", "description", "amount", "category", "source"]]
-        top_df["amount"] = top_df["amount"].map(lambda x: f"₹{x:,.2f}")
+        top_df = pd.DataFrame(top_10, columns=["date", "description", "amount", "category", "source"])
         top_df["source"] = top_df["source"].map({"bank": "Bank", "credit_card": "Credit Card"})
         top_df.columns = ["Date", "Description", "Amount", "Category", "Source"]
         top_df.index = range(1, len(top_df) + 1)
-        st.dataframe(top_df, use_container_width=True)
+        st.dataframe(top_df, use_container_width=True, column_config=_AMOUNT_COLUMN)
     else:
         st.info("No expenses recorded for this month.")
 
@@ -273,54 +391,61 @@ def render(email_only: Optional[bool] = None):
 def _render_trend(
     available: list[tuple[int, int]],
     email_only: Optional[bool] = None,
+    key: Optional[str] = None,
 ):
     """Render month-over-month earnings vs expenses trend chart."""
-    trend_data = []
-    for y, m in reversed(available):  # chronological order
-        summary = get_monthly_summary(m, y, email_only=email_only)
-        label = datetime(y, m, 1).strftime("%b %Y")
-        t_in = summary["transfer_in"]
-        t_out = summary["transfer_out"]
-        net_t = t_in - t_out
-        t_deficit = abs(net_t) if net_t < 0 else 0
-        earn = summary["total_earnings"] - t_in
-        spend = summary["total_expenses"] - summary["investment"] - t_out + t_deficit
-        trend_data.append({
-            "Month": label,
-            "Earnings": earn,
-            "Expenses": spend,
-            "Savings": earn - spend,
-        })
-
-    trend_df = pd.DataFrame(trend_data)
-
-    fig = go.Figure()
+    # One aggregate query for all months; months whose transactions are all
+    # excluded have no row, so reindex onto `available` with zeros.
+    chronological = list(reversed(available))
+    summary = pd.DataFrame(_cached_monthly_summary_bulk(email_only))
+    if summary.empty:
+        summary = pd.DataFrame(columns=[
+            "year", "month", "total_earnings", "total_expenses",
+            "transfer_in", "transfer_out", "investment",
+        ])
+    summary = (
+        summary.set_index(["year", "month"])
+        .reindex(pd.MultiIndex.from_tuples(chronological, names=["year", "month"]))
+        .fillna(0)
+        .astype(float)
+    )
+
+    earn, spend, savings = _compute_flows(
+        summary["total_earnings"], summary["total_expenses"],
+        summary["investment"], summary["transfer_in"], summary["transfer_out"],
+    )
+
+    fig = _build_trend_fig(
+        tuple(f"{month_abbr[m]} {y}" for y, m in chronological),
+        tuple(earn.tolist()), tuple(spend.tolist()), tuple(savings.tolist()),
+    )
+    st.plotly_chart(fig, use_container_width=True, key=key)
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _build_trend_fig(
+    months: tuple, earnings: tuple, expenses: tuple, savings: tuple,
+) -> go.Figure:
+    """Build the grouped earnings/expenses bars with the savings line."""
+    fig = go.Figure(layout=_TREND_LAYOUT)
     fig.add_trace(go.Bar(
-        x=trend_df["Month"],
-        y=trend_df["Earnings"],
+        x=list(months),
+        y=list(earnings),
         name="Earnings",
         marker_color="#2ecc71",
     ))
     fig.add_trace(go.Bar(
-        x=trend_df["Month"],
-        y=trend_df["Expenses"],
+        x=list(months),
+        y=list(expenses),
         name="Expenses",
         marker_color="#e74c3c",
     ))
     fig.add_trace(go.Scatter(
-        x=trend_df["Month"],
-        y=trend_df["Savings"],
+        x=list(months),
+        y=list(savings),
         name="Net Savings",
         mode="lines+markers",
         line=dict(color="#3498db", width=3),
         marker=dict(size=8),
     ))
-    fig.update_layout(
-        barmode="group",
-        xaxis_title="",
-        yaxis_title="Amount (₹)",
-        legend=dict(orientation="h", y=1.1),
-        margin=dict(t=40, b=20, l=20, r=20),
-        height=400,
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
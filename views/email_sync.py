@@ -1,7 +1,16 @@
 """Email Sync page -- fetch bank transaction alerts from email via IMAP."""
 
+import atexit
+import calendar
+import imaplib
+import itertools
 import json
+import threading
+import time
+from contextlib import contextmanager
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
@@ -9,12 +18,15 @@ from core.email_parser import (
     IMAP_PRESETS,
     EmailConnectionError,
     FetchCancelledError,
+    connect_imap,
+    disconnect_imap,
     fetch_transactions_from_email,
 )
 from core.database import (
-    insert_transactions,
+    insert_transactions_returning_ids,
+    flag_cc_payments_visible,
+    transaction,
     get_all_categories,
-    get_transactions,
     get_setting,
     set_setting,
     delete_setting,
@@ -24,10 +36,90 @@ from core.database import (
     find_within_file_duplicates,
 )
 from core.dedup import detect_cc_payments
-from core.categorizer import categorize_transactions
+from core.categorizer import categorize_transactions_chunked
+from views.review import pick_skipped
 
 _EMAIL_CONFIG_KEY = "email_sync_config"
 
+# Rows shown in the fetched-transactions preview table
+_PREVIEW_ROWS = 500
+
+_PROVIDER_NAMES = tuple(IMAP_PRESETS)
+
+# Preset provider for a saved IMAP host; unknown hosts map to "Custom"
+_HOST_TO_PROVIDER = {
+    preset["host"]: name for name, preset in IMAP_PRESETS.items() if name != "Custom"
+}
+
+
+# ---------------------------------------------------------------------------
+# IMAP connection reuse -- testing the connection and fetching (or
+# re-fetching another month) share one logged-in session, skipping the TLS
+# handshake and LOGIN. A connection is checked out while in use, so two
+# browser sessions never issue commands on the same socket.
+# ---------------------------------------------------------------------------
+
+_IMAP_IDLE_TIMEOUT = 300  # seconds before a parked connection is not trusted
+_imap_pool: dict[tuple, tuple[imaplib.IMAP4_SSL, float]] = {}
+_imap_pool_lock = threading.Lock()
+
+
+def _imap_key(config: dict) -> tuple:
+    # The password is part of the key so changed credentials log in afresh
+    return (config["host"], config["port"], config["email"], config["password"])
+
+
+def _checkout_imap(config: dict) -> imaplib.IMAP4_SSL:
+    """Take a live pooled connection for ``config``, or log in a new one."""
+    with _imap_pool_lock:
+        cached = _imap_pool.pop(_imap_key(config), None)
+    if cached:
+        mail, last_used = cached
+        if time.monotonic() - last_used < _IMAP_IDLE_TIMEOUT:
+            try:
+                mail.noop()
+                return mail
+            except Exception:
+                pass
+        disconnect_imap(mail)
+    return connect_imap(config["host"], config["port"], config["email"], config["password"])
+
+
+def _checkin_imap(config: dict, mail: imaplib.IMAP4_SSL) -> None:
+    """Park a healthy connection for the next fetch."""
+    with _imap_pool_lock:
+        replaced = _imap_pool.pop(_imap_key(config), None)
+        _imap_pool[_imap_key(config)] = (mail, time.monotonic())
+    if replaced:
+        disconnect_imap(replaced[0])
+
+
+@contextmanager
+def _pooled_imap(config: dict):
+    """Yield a logged-in connection and return it to the pool afterwards.
+
+    A cancelled fetch leaves the session usable; any other error drops it.
+    """
+    mail = _checkout_imap(config)
+    try:
+        yield mail
+    except FetchCancelledError:
+        _checkin_imap(config, mail)
+        raise
+    except BaseException:
+        disconnect_imap(mail)
+        raise
+    _checkin_imap(config, mail)
+
+
+@atexit.register
+def _close_imap_pool() -> None:
+    with _imap_pool_lock:
+        cached = list(_imap_pool.values())
+        _imap_pool.clear()
+    for mail, _ in cached:
+        disconnect_imap(mail)
+
 
 @st.dialog("Already Synced")
 def _resync_confirm_dialog(source_key: str):
@@ -88,7 +180,7 @@ def render():
             "Month to fetch",
             list(range(1, 13)),
             index=now.month - 1,
-            format_func=lambda m: datetime(2000, m, 1).strftime("%B"),
+            format_func=lambda m: calendar.month_name[m],
             key="email_sync_month",
         )
 
@@ -105,7 +197,7 @@ def render():
     source_key = "bank"
 
     # --- Fetch button (with override confirmation if already synced) ---
-    month_name = datetime(year, month, 1).strftime("%B %Y")
+    month_name = f"{calendar.month_name[month]} {year}"
     existing_count = _get_existing_sync_count(month, year)
 
     # Handle deferred resync from dialog (dialog closed, now we fetch)
@@ -161,13 +253,8 @@ def _restore_saved_config():
 
     # Populate the widget default values via session state
     # (Streamlit reads these before rendering the widgets)
-    provider_names = list(IMAP_PRESETS.keys())
     saved_host = saved.get("host", "")
-    matched_provider = "Custom"
-    for name, preset in IMAP_PRESETS.items():
-        if preset.get("host") == saved_host and name != "Custom":
-            matched_provider = name
-            break
+    matched_provider = _HOST_TO_PROVIDER.get(saved_host, "Custom")
 
     if "email_provider" not in st.session_state:
         st.session_state["email_provider"] = matched_provider
@@ -223,6 +310,7 @@ def _delete_existing_sync(month: int, year: int) -> int:
             "WHERE uploaded_file LIKE 'email_%' AND month = ? AND year = ?",
             (month, year),
         )
+    st.cache_data.clear()
     return cursor.rowcount
 
 
@@ -242,7 +330,7 @@ def _render_email_config():
         with col1:
             provider = st.selectbox(
                 "Email Provider",
-                list(IMAP_PRESETS.keys()),
+                _PROVIDER_NAMES,
                 key="email_provider",
             )
 
@@ -280,7 +368,7 @@ def _render_email_config():
         # Store config in session state and persist to DB
         if email_address and password:
             config = {
-                "host": imap_host if provider == "Custom" else preset["host"],
+                "host": imap_host,
                 "port": imap_port,
                 "email": email_address,
                 "password": password,
@@ -316,14 +404,8 @@ def _test_connection():
     config = st.session_state.get("email_config", {})
     with st.spinner("Testing connection..."):
         try:
-            from core.email_parser import connect_imap, disconnect_imap
-            mail = connect_imap(
-                config["host"],
-                config["port"],
-                config["email"],
-                config["password"],
-            )
-            disconnect_imap(mail)
+            with _pooled_imap(config):
+                pass
             st.success("Connection successful! Your email credentials are valid.")
         except EmailConnectionError as e:
             st.error(f"Connection failed: {e}")
@@ -335,10 +417,21 @@ def _test_connection():
 # Fetch and display transactions (synchronous with live progress)
 # ---------------------------------------------------------------------------
 
+# Widget keys of the review grids; their edits belong to one fetch only
+_REVIEW_KEYS = ("email_oom", "email_wfd", "email_dbd")
+
+
+def _set_fetched(transactions: list[dict]) -> None:
+    """Replace the fetched transactions and drop review edits made for the old ones."""
+    st.session_state["email_transactions"] = transactions
+    for key in _REVIEW_KEYS:
+        st.session_state.pop(key, None)
+
+
 def _fetch_and_display(month: int, year: int, source_key: str):
     """Fetch transaction emails with a live progress indicator and cancel support."""
     config = st.session_state.get("email_config", {})
-    month_name = datetime(year, month, 1).strftime("%B %Y")
+    month_name = f"{calendar.month_name[month]} {year}"
 
     # Reset cancel flag
     st.session_state["_email_fetch_cancel"] = False
@@ -362,21 +455,23 @@ def _fetch_and_display(month: int, year: int, source_key: str):
         return st.session_state.get("_email_fetch_cancel", False)
 
     try:
-        transactions = fetch_transactions_from_email(
-            host=config["host"],
-            port=config["port"],
-            email_address=config["email"],
-            password=config["password"],
-            month=month,
-            year=year,
-            folder=config.get("folder", "INBOX"),
-            on_progress=_on_progress,
-            is_cancelled=_is_cancelled,
-        )
+        with _pooled_imap(config) as mail:
+            transactions = fetch_transactions_from_email(
+                host=config["host"],
+                port=config["port"],
+                email_address=config["email"],
+                password=config["password"],
+                month=month,
+                year=year,
+                folder=config.get("folder", "INBOX"),
+                on_progress=_on_progress,
+                is_cancelled=_is_cancelled,
+                mail=mail,
+            )
     except FetchCancelledError:
         status_container.update(label="Fetch cancelled", state="error", expanded=False)
         st.warning("Email fetch was cancelled.")
-        st.session_state["email_transactions"] = []
+        _set_fetched([])
         return
     except EmailConnectionError as e:
         status_container.update(label="Connection failed", state="error", expanded=False)
@@ -396,7 +491,7 @@ def _fetch_and_display(month: int, year: int, source_key: str):
             "- Alert emails are in a different folder (try '[Gmail]/All Mail')\n"
             "- The sender addresses aren't recognised (check email filters)"
         )
-        st.session_state["email_transactions"] = []
+        _set_fetched([])
         return
 
     # Tag each transaction with source info
@@ -406,7 +501,7 @@ def _fetch_and_display(month: int, year: int, source_key: str):
     status_container.update(
         label=f"Found {len(transactions)} transaction(s)", state="complete", expanded=False,
     )
-    st.session_state["email_transactions"] = transactions
+    _set_fetched(transactions)
     st.success(f"Found **{len(transactions)}** transaction(s) from email alerts for {month_name}!")
 
 
@@ -424,40 +519,51 @@ def _render_preview_and_save(transactions: list[dict], source_key: str, month: i
     within_dupes = find_within_file_duplicates(transactions)
     db_dupes = find_duplicate_transactions(transactions, email_only=True)
 
-    txns_to_skip = set()
+    # One skip flag per fetched transaction, set by each review grid
+    skip = np.zeros(len(transactions), dtype=bool)
 
     if out_of_month:
-        txns_to_skip |= _show_out_of_month_dialog(transactions, out_of_month, month, year)
+        skip[_show_out_of_month_dialog(transactions, out_of_month, month, year)] = True
 
     if within_dupes:
-        txns_to_skip |= _show_within_dupes_dialog(transactions, within_dupes)
+        skip[_show_within_dupes_dialog(transactions, within_dupes)] = True
 
     if db_dupes:
-        txns_to_skip |= _show_db_dupes_dialog(db_dupes)
+        skip[_show_db_dupes_dialog(db_dupes)] = True
 
     # --- Filter ---
-    filtered = [t for i, t in enumerate(transactions) if i not in txns_to_skip]
+    filtered = list(itertools.compress(transactions, ~skip))
 
-    if txns_to_skip:
-        st.caption(f"{len(txns_to_skip)} transaction(s) will be skipped (out-of-month or duplicates)")
+    skipped = int(skip.sum())
+    if skipped:
+        st.caption(f"{skipped} transaction(s) will be skipped (out-of-month or duplicates)")
 
     # --- Preview table ---
     if filtered:
-        preview_df = pd.DataFrame([
-            {
-                "Date": t["date"],
-                "Description": t["description"][:60],
-                "Amount": f"₹{t['amount']:,.2f}",
-                "Type": t["type"].capitalize(),
-            }
-            for t in filtered
-        ])
+        preview_df = pd.DataFrame({
+            "Date": [t["date"] for t in filtered],
+            "Description": [t["description"][:60] for t in filtered],
+            "Amount": [t["amount"] for t in filtered],
+            "Type": [t["type"].capitalize() for t in filtered],
+        })
         preview_df.index = range(1, len(preview_df) + 1)
-        st.dataframe(preview_df, use_container_width=True, height=350)
+        # Only the first rows are sent to the browser; totals and the save
+        # below still cover every transaction
+        st.dataframe(
+            preview_df.head(_PREVIEW_ROWS), use_container_width=True, height=350,
+            column_config={"Amount": st.column_config.NumberColumn(format="₹%.2f")},
+        )
+        if len(preview_df) > _PREVIEW_ROWS:
+            st.caption(
+                f"Showing the first {_PREVIEW_ROWS} of {len(preview_df)} transactions; "
+                f"all of them will be saved."
+            )
 
         # --- Summary metrics ---
-        total_debits = sum(t["amount"] for t in filtered if t["type"] == "debit")
-        total_credits = sum(t["amount"] for t in filtered if t["type"] == "credit")
+        # One grouped sum over the preview frame gives both totals
+        totals = preview_df.groupby("Type")["Amount"].sum()
+        total_debits = totals.get("Debit", 0.0)
+        total_credits = totals.get("Credit", 0.0)
 
         m1, m2, m3 = st.columns(3)
         m1.metric("Total Debits", f"₹{total_debits:,.2f}")
@@ -468,7 +574,7 @@ def _render_preview_and_save(transactions: list[dict], source_key: str, month: i
         if st.button("Save & Categorize", type="primary", use_container_width=True, key="email_save"):
             _save_and_categorize(filtered, source_key, month, year)
             # Clear fetched transactions after save
-            st.session_state["email_transactions"] = []
+            _set_fetched([])
             st.rerun()
     else:
         st.warning("No transactions to save after filtering.")
@@ -480,68 +586,52 @@ def _render_preview_and_save(transactions: list[dict], source_key: str, month: i
 
 def _find_out_of_month(txns: list[dict], month: int, year: int) -> list[int]:
     """Return indices of transactions outside the selected month."""
-    out = []
-    for i, t in enumerate(txns):
-        try:
-            d = datetime.strptime(t["date"], "%Y-%m-%d")
-            if d.month != month or d.year != year:
-                out.append(i)
-        except (ValueError, TypeError):
-            pass
-    return out
+    # Unparseable dates become NaT and are left alone, as before
+    dates = pd.to_datetime(
+        pd.Series([t.get("date") for t in txns], dtype=object),
+        format="%Y-%m-%d", errors="coerce",
+    )
+    outside = dates.notna() & ((dates.dt.month != month) | (dates.dt.year != year))
+    return np.flatnonzero(outside.to_numpy()).tolist()
 
 
 def _show_out_of_month_dialog(txns, indices, month, year):
-    month_name = datetime(year, month, 1).strftime("%B %Y")
-    skip_set = set()
+    month_name = f"{calendar.month_name[month]} {year}"
     with st.expander(f"⚠️ {len(indices)} transaction(s) outside {month_name}", expanded=True):
         st.warning(
             f"These transactions have dates outside **{month_name}**. "
-            f"Uncheck to exclude from this sync."
+            f"Untick Skip to include them in this sync."
         )
-        for idx in indices:
-            t = txns[idx]
-            keep = st.checkbox(
-                f"{t['date']} | {t['description'][:50]} | ₹{t['amount']:,.2f}",
-                value=False,
-                key=f"email_oom_{idx}",
-            )
-            if not keep:
-                skip_set.add(idx)
-    return skip_set
+        flagged = [txns[idx] for idx in indices]
+        return pick_skipped(indices, {
+            "Date": [t["date"] for t in flagged],
+            "Description": [t["description"][:50] for t in flagged],
+            "Amount": [t["amount"] for t in flagged],
+        }, key="email_oom")
 
 
 def _show_within_dupes_dialog(txns, dupe_pairs):
-    skip_set = set()
     with st.expander(f"⚠️ {len(dupe_pairs)} duplicate(s) in fetched emails", expanded=True):
         st.warning("Duplicate transactions detected. Second occurrence will be skipped by default.")
-        for idx_a, idx_b in dupe_pairs:
-            t = txns[idx_b]
-            keep = st.checkbox(
-                f"Duplicate: {t['date']} | {t['description'][:50]} | ₹{t['amount']:,.2f}",
-                value=False,
-                key=f"email_wfd_{idx_b}",
-            )
-            if not keep:
-                skip_set.add(idx_b)
-    return skip_set
+        indices = [idx_b for _, idx_b in dupe_pairs]
+        flagged = [txns[idx] for idx in indices]
+        return pick_skipped(indices, {
+            "Date": [t["date"] for t in flagged],
+            "Description": [t["description"][:50] for t in flagged],
+            "Amount": [t["amount"] for t in flagged],
+        }, key="email_wfd")
 
 
 def _show_db_dupes_dialog(db_dupes):
-    skip_set = set()
     with st.expander(f"⚠️ {len(db_dupes)} transaction(s) already in database", expanded=True):
         st.warning("These match existing records. They'll be skipped to avoid double-counting.")
-        for d in db_dupes:
-            t = d["new_txn"]
-            keep = st.checkbox(
-                f"{t['date']} | {t['description'][:45]} | ₹{t['amount']:,.2f} "
-                f"(matches: {d['existing_desc'][:30]}...)",
-                value=False,
-                key=f"email_dbd_{d['new_idx']}",
-            )
-            if not keep:
-                skip_set.add(d["new_idx"])
-    return skip_set
+        flagged = [d["new_txn"] for d in db_dupes]
+        return pick_skipped([d["new_idx"] for d in db_dupes], {
+            "Date": [t["date"] for t in flagged],
+            "Description": [t["description"][:45] for t in flagged],
+            "Amount": [t["amount"] for t in flagged],
+            "Matches": [d["existing_desc"][:30] for d in db_dupes],
+        }, key="email_dbd")
 
 
 # ---------------------------------------------------------------------------
@@ -567,67 +657,93 @@ def _save_and_categorize(transactions: list[dict], source_key: str, month: int,
             "email_body": t.get("email_body"),
         })
 
-    with st.spinner("Saving transactions..."):
-        count = insert_transactions(rows)
+    # Insert and CC flagging commit together
+    with st.spinner("Saving transactions..."), transaction():
+        ids = insert_transactions_returning_ids(rows)
 
-    st.success(f"Saved **{count}** transactions from email.")
+        # Keep the saved rows in memory so the follow-up steps don't re-read the month
+        saved_txns = [{**row, "id": txn_id} for row, txn_id in zip(rows, ids)]
 
-    # --- CC payment deduplication (bank statements only) ---
-    if source_key == "bank":
-        with st.spinner("Checking for credit card payment duplicates..."):
-            saved_txns = get_transactions(
-                month=month, year=year, source="bank",
-                include_excluded=True, email_only=True,
-            )
-            flagged_ids = detect_cc_payments(saved_txns)
+        # --- CC payment deduplication (bank statements only) ---
+        flagged_ids = detect_cc_payments(saved_txns) if source_key == "bank" else []
+        if flagged_ids:
+            flag_cc_payments_visible(flagged_ids)
+    st.cache_data.clear()
 
-            if flagged_ids:
-                from core.database import flag_cc_payments_visible
-                flag_cc_payments_visible(flagged_ids)
-                st.warning(
-                    f"Flagged **{len(flagged_ids)}** transaction(s) as likely credit card payments."
-                )
+    st.success(f"Saved **{len(saved_txns)}** transactions from email.")
+
+    if flagged_ids:
+        flagged = set(flagged_ids)
+        for t in saved_txns:
+            if t["id"] in flagged:
+                t["is_cc_payment"] = 1
+                t["is_excluded"] = 1
+                t["category"] = "Credit Card Payment"
+        st.warning(
+            f"Flagged **{len(flagged_ids)}** transaction(s) as likely credit card payments."
+        )
 
     # --- LLM Categorization (email transactions only) ---
-    with st.spinner("Categorizing with Ollama..."):
-        try:
-            saved_txns = get_transactions(month=month, year=year, email_only=True)
-            uncategorized = [t for t in saved_txns if not t.get("category")]
-
-            if uncategorized:
-                categories = get_all_categories()
-                results = categorize_transactions(uncategorized, categories)
-
-                if results:
-                    from core.database import bulk_update_categories
-                    bulk_update_categories(results)
-                    st.success(
-                        f"Auto-categorized **{len(results)}** / {len(uncategorized)} transactions."
-                    )
-                else:
-                    st.info("Categorization returned no results. Categorize manually in Email > Transactions.")
-            else:
-                st.info("All transactions already have categories.")
-        except RuntimeError as e:
-            st.warning(f"Categorization skipped: {e}")
-        except Exception as e:
-            st.warning(f"Categorization issue: {e}")
+    uncategorized = [
+        t for t in saved_txns if not t["is_excluded"] and not t.get("category")
+    ]
+    if not uncategorized:
+        st.info("All transactions already have categories.")
+        return
+
+    progress = st.progress(0.0, text="Categorizing with Ollama... This may take a moment.")
+    results: dict[int, str] = {}
+    issue = None
+    try:
+        categories = get_all_categories()
+        for done, total, partial in categorize_transactions_chunked(uncategorized, categories):
+            results.update(partial)
+            progress.progress(done / total, text=f"Categorized {done} / {total} transactions...")
+    except RuntimeError as e:
+        issue = f"Categorization skipped: {e}"
+    except Exception as e:
+        issue = f"Categorization issue: {e}"
+    progress.empty()
+
+    # Keep whatever finished before a failing batch
+    if results:
+        from core.database import bulk_update_categories
+        bulk_update_categories(results)
+        st.cache_data.clear()
+        st.success(
+            f"Auto-categorized **{len(results)}** / {len(uncategorized)} transactions."
+        )
+    if issue:
+        st.warning(issue)
+    elif not results:
+        st.info("Categorization returned no results. Categorize manually in Email > Transactions.")
 
 
 # ---------------------------------------------------------------------------
 # Sync history
 # ---------------------------------------------------------------------------
 
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_sync_history() -> list[dict]:
+    # Every write on this page is followed by st.cache_data.clear()
+    return get_upload_history(email_only=True)
+
+
+@st.fragment
 def _render_sync_history():
-    """Show past email syncs with option to delete."""
-    history = get_upload_history(email_only=True)
+    """Show past email syncs with option to delete.
+
+    Runs as a fragment, so a Delete click reruns only this section before
+    the full-page rerun that refreshes everything else.
+    """
+    history = _cached_sync_history()
     if not history:
         return
 
     st.subheader("Sync History")
 
     for h in history:
-        month_label = datetime(h["year"], h["month"], 1).strftime("%B %Y")
+        month_label = f"{calendar.month_name[h['month']]} {h['year']}"
 
         col1, col2, col3, col4 = st.columns([3, 1.5, 1, 1])
         with col1:
@@ -640,5 +756,6 @@ def _render_sync_history():
         with col4:
             if st.button("Delete", key=f"edel_{h['uploaded_file']}_{h['month']}_{h['year']}"):
                 deleted = delete_transactions_by_file(h["uploaded_file"])
+                st.cache_data.clear()
                 st.success(f"Deleted {deleted} transaction(s) for {month_label}")
                 st.rerun()
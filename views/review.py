@@ -0,0 +1,27 @@
+"""Review grid shared by the Upload and Email Sync pages for flagged transactions."""
+
+import streamlit as st
+import numpy as np
+import pandas as pd
+
+
+def pick_skipped(indices: list[int], columns: dict[str, list], key: str) -> np.ndarray:
+    """Show flagged transactions in one editable grid; return the indices left ticked to skip.
+
+    A single st.data_editor replaces a checkbox per flagged row, so a large
+    statement or fetch doesn't turn into hundreds of widgets.
+    """
+    grid = pd.DataFrame({"Skip": True, **columns}, index=indices)
+    edited = st.data_editor(
+        grid,
+        key=key,
+        hide_index=True,
+        use_container_width=True,
+        num_rows="fixed",
+        disabled=[c for c in grid.columns if c != "Skip"],
+        column_config={
+            "Skip": st.column_config.CheckboxColumn(help="Untick to keep this transaction"),
+            "Amount": st.column_config.NumberColumn(format="₹%.2f"),
+        },
+    )
+    return edited.index[edited["Skip"]].to_numpy(dtype=np.intp)
@@ -1,6 +1,10 @@
 """Transactions page -- view, filter, edit categories, smart re-categorize."""
 
+import math
+from functools import lru_cache
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from typing import Optional
@@ -9,17 +13,57 @@ from core.database import (
     get_transactions,
     get_all_categories,
     get_available_months,
-    update_transaction_category,
-    update_transaction_exclusion,
     bulk_update_categories,
+    bulk_update_exclusions,
+    set_category_for_ids,
     add_category,
-    find_similar_transactions,
+    find_similar_transactions_batch,
     upsert_category_rule,
     get_all_rules,
     delete_rule,
     update_rule,
+    transaction,
 )
-from core.categorizer import categorize_transactions
+from core.categorizer import categorize_transactions_chunked
+
+
+# ---------------------------------------------------------------------------
+# Cached DB reads -- every checkbox tick or selectbox change reruns the page.
+# Every write below is followed by st.cache_data.clear().
+# ---------------------------------------------------------------------------
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_transactions(
+    month: Optional[int], year: Optional[int], source: Optional[str],
+    include_excluded: bool, email_only: Optional[bool],
+    category: Optional[str] = None, uncategorized_only: bool = False,
+    order_by: str = "date_desc",
+) -> list[dict]:
+    return get_transactions(
+        month=month, year=year, source=source,
+        include_excluded=include_excluded, email_only=email_only,
+        category=category, uncategorized_only=uncategorized_only,
+        order_by=order_by,
+    )
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_available_months(email_only: Optional[bool]) -> list[tuple[int, int]]:
+    return get_available_months(email_only=email_only)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_categories() -> list[str]:
+    return get_all_categories()
+
+
+@st.cache_data(show_spinner=False)
+def _month_options(
+    available: tuple[tuple[int, int], ...],
+) -> tuple[list[str], dict[str, tuple[int, int]]]:
+    """Return the month filter labels and a label -> (year, month) lookup."""
+    label_to_ym = {datetime(y, m, 1).strftime("%B %Y"): (y, m) for y, m in available}
+    return ["All months", *label_to_ym], label_to_ym
 
 
 # ---------------------------------------------------------------------------
@@ -31,21 +75,27 @@ def _cat_version(pfx: str) -> int:
     return st.session_state.get(f"{pfx}_cat_version", 0)
 
 
-def _cat_key(pfx: str, txn_id: int) -> str:
-    """Build a versioned selectbox key for a transaction's category."""
-    return f"{pfx}cat_{txn_id}_v{_cat_version(pfx)}"
-
-
 def _bump_cat_version(pfx: str) -> None:
     """Increment the category-widget version.
 
-    All old selectbox keys become orphaned; on the next render Streamlit
-    creates brand-new widgets that read their initial value from the DB
-    via the `index` parameter -- completely bypassing any cached state.
+    The transaction grid's key includes the version, so the old grid (and
+    its pending edit state) is orphaned; on the next render Streamlit creates
+    a brand-new grid from DB values -- completely bypassing any cached state.
     """
     st.session_state[f"{pfx}_cat_version"] = _cat_version(pfx) + 1
 
 
+def _clear_dialog_keys(pfx: str) -> None:
+    """Drop the recat dialog's per-transaction checkbox keys.
+
+    One key is created per similar transaction shown, so without this they
+    pile up in session state across dialogs.
+    """
+    prefix = f"{pfx}dlg_sel_"
+    for key in [k for k in st.session_state if str(k).startswith(prefix)]:
+        del st.session_state[key]
+
+
 # ---------------------------------------------------------------------------
 # Re-categorization modal dialog (true overlay popup)
 # ---------------------------------------------------------------------------
@@ -90,16 +140,17 @@ def _recat_dialog(source_txn: dict, old_cat: str, new_cat: str, similar: list[di
             disabled=len(selected_ids) == 0,
         ):
             if selected_ids:
-                bulk_update_categories({tid: new_cat for tid in selected_ids})
-                # Bump widget version so ALL selectboxes are recreated fresh
+                set_category_for_ids(selected_ids, new_cat)
+                st.cache_data.clear()
+                # Bump widget version so the grid is recreated fresh
                 # from DB values on the next render -- no stale cache possible.
                 _bump_cat_version(pfx)
-            st.session_state[f"{pfx}scroll_to_txn"] = source_txn["id"]
+            _clear_dialog_keys(pfx)
             st.rerun()
 
     with col_skip:
         if st.button("Skip", use_container_width=True):
-            st.session_state[f"{pfx}scroll_to_txn"] = source_txn["id"]
+            _clear_dialog_keys(pfx)
             st.rerun()
 
 
@@ -107,6 +158,16 @@ def _recat_dialog(source_txn: dict, old_cat: str, new_cat: str, similar: list[di
 # Main render
 # ---------------------------------------------------------------------------
 
+# "Sort by" labels -> get_transactions(order_by=...) keys
+_SORT_ORDERS = {
+    "Date (newest)": "date_desc",
+    "Date (oldest)": "date_asc",
+    "Amount (high to low)": "amount_desc",
+    "Amount (low to high)": "amount_asc",
+    "Category A-Z": "category",
+}
+
+
 def render(email_only: Optional[bool] = None):
     # Key prefix to avoid widget collisions between Statements and Email sections
     pfx = "et_" if email_only else "st_"
@@ -114,18 +175,6 @@ def render(email_only: Optional[bool] = None):
 
     st.header(f"Transactions — {section_label}")
 
-    # Clear the one-shot skip set from the previous cycle
-    st.session_state.pop(f"{pfx}_skip_recat_ids", None)
-
-    # Handle deferred widget version bump from dialog actions
-    if st.session_state.pop(f"{pfx}_pending_bump", False):
-        _bump_cat_version(pfx)
-
-    # --- Scroll back to last-edited transaction if needed ---
-    scroll_target = st.session_state.pop(f"{pfx}scroll_to_txn", None)
-    if scroll_target is not None:
-        _inject_scroll_js(scroll_target)
-
     # --- Add custom category (always accessible at top) ---
     with st.expander("Add custom category"):
         col_a, col_b = st.columns([3, 1])
@@ -136,11 +185,12 @@ def render(email_only: Optional[bool] = None):
             st.write("")
             if st.button("Add Category", key=f"{pfx}add_cat_btn") and new_cat.strip():
                 add_category(new_cat.strip())
+                st.cache_data.clear()
                 st.success(f"Added category: **{new_cat.strip()}**")
                 st.rerun()
 
     # --- Filters row ---
-    available = get_available_months(email_only=email_only)
+    available = _cached_available_months(email_only)
     if not available:
         if email_only:
             st.info("No email transactions yet. Sync your email first.")
@@ -148,20 +198,14 @@ def render(email_only: Optional[bool] = None):
             st.info("No transactions yet. Upload a statement first.")
         return
 
-    categories = get_all_categories()
+    categories = _cached_categories()
 
     f1, f2, f3, f4 = st.columns(4)
 
     with f1:
-        options = ["All months"] + [
-            f"{datetime(y, m, 1).strftime('%B %Y')}" for y, m in available
-        ]
+        options, label_to_ym = _month_options(tuple(available))
         selected = st.selectbox("Month", options, key=f"{pfx}filter_month")
-        if selected == "All months":
-            sel_month, sel_year = None, None
-        else:
-            idx = options.index(selected) - 1
-            sel_year, sel_month = available[idx]
+        sel_year, sel_month = label_to_ym.get(selected, (None, None))
 
     with f2:
         source_filter = st.selectbox("Source", ["All", "Bank", "Credit Card"], key=f"{pfx}filter_source")
@@ -172,42 +216,32 @@ def render(email_only: Optional[bool] = None):
         cat_filter = st.selectbox("Category", cat_filter_opts, key=f"{pfx}filter_category")
 
     with f4:
-        sort_options = ["Date (newest)", "Date (oldest)", "Amount (high to low)", "Amount (low to high)", "Category A-Z"]
-        sort_by = st.selectbox("Sort by", sort_options, key=f"{pfx}sort_by")
-
-    # --- Fetch and filter ---
-    txns = get_transactions(
-        month=sel_month, year=sel_year, source=source_val,
-        include_excluded=True, email_only=email_only,
+        sort_by = st.selectbox("Sort by", list(_SORT_ORDERS), key=f"{pfx}sort_by")
+
+    # --- Fetch (category filter and sort run in SQL) ---
+    txns = _cached_transactions(
+        sel_month, sel_year, source_val, True, email_only,
+        category=cat_filter if cat_filter not in ("All categories", "Uncategorized") else None,
+        uncategorized_only=cat_filter == "Uncategorized",
+        order_by=_SORT_ORDERS[sort_by],
     )
 
-    # Apply category filter
-    if cat_filter == "Uncategorized":
-        txns = [t for t in txns if not t.get("category")]
-    elif cat_filter != "All categories":
-        txns = [t for t in txns if t.get("category") == cat_filter]
-
-    # Apply sort
-    if sort_by == "Date (newest)":
-        txns.sort(key=lambda t: (t["date"], t["id"]), reverse=True)
-    elif sort_by == "Date (oldest)":
-        txns.sort(key=lambda t: (t["date"], t["id"]))
-    elif sort_by == "Amount (high to low)":
-        txns.sort(key=lambda t: t["amount"], reverse=True)
-    elif sort_by == "Amount (low to high)":
-        txns.sort(key=lambda t: t["amount"])
-    elif sort_by == "Category A-Z":
-        txns.sort(key=lambda t: (t.get("category") or "zzz").lower())
-
     if not txns:
         st.info("No transactions found for the selected filters.")
         return
 
+    # Columnar copy of the result set: the summary and the grid page both
+    # read from it instead of walking the list of dicts
+    df = pd.DataFrame(txns)
+
     # --- Summary bar (only non-excluded in totals) ---
-    total_debit = sum(t["amount"] for t in txns if t["type"] == "debit" and not t["is_excluded"])
-    total_credit = sum(t["amount"] for t in txns if t["type"] == "credit" and not t["is_excluded"])
-    uncategorized_count = sum(1 for t in txns if not t.get("category"))
-    cc_flagged_count = sum(1 for t in txns if t["is_excluded"])
+    excluded = df["is_excluded"].astype(bool)
+    # One grouped reduction yields both totals instead of two masked sums
+    totals = df["amount"][~excluded].groupby(df["type"][~excluded]).sum()
+    total_debit = totals.get("debit", 0.0)
+    total_credit = totals.get("credit", 0.0)
+    uncategorized_count = int((df["category"].isna() | (df["category"] == "")).sum())
+    cc_flagged_count = int(excluded.sum())
 
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("Total Expenses", f"₹{total_debit:,.2f}")
@@ -234,26 +268,85 @@ def render(email_only: Optional[bool] = None):
     # --- Rule management ---
     _render_rule_management(pfx, categories)
 
-    # --- Transaction list with per-row save ---
+    # --- Transaction grid with immediate save ---
     st.subheader(f"Showing {len(txns)} transaction(s)")
-    st.caption("Category and Excluded changes save immediately.")
+    st.caption("Edit Category / Excl. in the grid, then click **Save changes**.")
 
-    for i, txn in enumerate(txns):
-        _render_transaction_row(txn, categories, i, pfx, email_only)
+    _render_transaction_list(df, categories, pfx, email_only)
 
-    # --- Open recat dialog if triggered (renders as popup over the page) ---
-    if st.session_state.get(f"{pfx}pending_recat"):
-        data = st.session_state.pop(f"{pfx}pending_recat")
+    # --- Open next queued recat dialog (renders as popup over the page) ---
+    queue = st.session_state.get(f"{pfx}pending_recat")
+    if queue:
+        data = queue.pop(0)
+        if not queue:
+            del st.session_state[f"{pfx}pending_recat"]
         _recat_dialog(
             data["source_txn"], data["old_cat"],
             data["new_cat"], data["similar"], pfx,
         )
+    else:
+        # Dialog dismissed with the close button: its checkbox keys are stale
+        _clear_dialog_keys(pfx)
 
 
 # ---------------------------------------------------------------------------
-# Transaction row
+# Transaction grid
 # ---------------------------------------------------------------------------
 
+# Rows per grid page -- only the visible page is sent to the browser
+_PAGE_SIZE = 50
+
+
+@st.fragment
+def _render_transaction_list(
+    df: pd.DataFrame, categories: list[str],
+    pfx: str, email_only: Optional[bool],
+):
+    """Render the pager and the current page of the grid.
+
+    Runs as a fragment, so paging reruns only this block instead of the
+    filters, summary bar and rule manager above it. Saving the grid still
+    triggers a full rerun because it changes the summary.
+    """
+    page = _render_pager(pfx, len(df))
+    page_df = df.iloc[page * _PAGE_SIZE:(page + 1) * _PAGE_SIZE]
+    _render_transaction_grid(page_df, categories, pfx, email_only, page)
+
+
+def _set_page(pfx: str, page: int) -> None:
+    st.session_state[f"{pfx}txn_page"] = page
+
+
+def _render_pager(pfx: str, total: int) -> int:
+    """Render Prev / Next controls and return the current 0-based page."""
+    page_count = max(1, math.ceil(total / _PAGE_SIZE))
+    # Clamp: a narrower filter may leave the stored page out of range
+    page = min(st.session_state.get(f"{pfx}txn_page", 0), page_count - 1)
+    st.session_state[f"{pfx}txn_page"] = page
+    if page_count == 1:
+        return page
+
+    p1, p2, p3 = st.columns([1, 2, 1])
+    with p1:
+        st.button(
+            "◀ Prev", key=f"{pfx}page_prev", disabled=page == 0, use_container_width=True,
+            on_click=_set_page, args=(pfx, page - 1),
+        )
+    with p2:
+        first = page * _PAGE_SIZE + 1
+        last = min(total, (page + 1) * _PAGE_SIZE)
+        st.caption(f"Page {page + 1} of {page_count} (rows {first}-{last})")
+    with p3:
+        st.button(
+            "Next ▶", key=f"{pfx}page_next", disabled=page == page_count - 1,
+            use_container_width=True, on_click=_set_page, args=(pfx, page + 1),
+        )
+    return page
+
+
+# Pure string -> string, so repeated descriptions across reruns (and across
+# the grid and rule learning) are parsed once
+@lru_cache(maxsize=4096)
 def _friendly_description(desc: str) -> str:
     """Extract a human-friendly merchant/payee name from bank descriptions.
 
@@ -266,9 +359,11 @@ def _friendly_description(desc: str) -> str:
         return desc
 
     d = desc.strip()
+    # Only the prefix decides the format; "ECOM PUR/" is the longest at 9 chars
+    head = d[:9].upper()
 
     # UPI: extract merchant/payee name (4th segment usually)
-    if d.upper().startswith("UPI/"):
+    if head.startswith("UPI/"):
         parts = d.split("/")
         if len(parts) >= 4:
             name = parts[3].strip()
@@ -279,7 +374,7 @@ def _friendly_description(desc: str) -> str:
         return d
 
     # NEFT: extract payee name (3rd segment)
-    if d.upper().startswith("NEFT/"):
+    if head.startswith("NEFT/"):
         parts = d.split("/")
         if len(parts) >= 3:
             name = parts[2].strip()
@@ -289,7 +384,7 @@ def _friendly_description(desc: str) -> str:
         return d
 
     # RTGS: extract payee name (3rd segment)
-    if d.upper().startswith("RTGS/"):
+    if head.startswith("RTGS/"):
         parts = d.split("/")
         if len(parts) >= 3:
             name = parts[2].strip()
@@ -299,14 +394,14 @@ def _friendly_description(desc: str) -> str:
         return d
 
     # ECOM PUR: extract merchant (2nd segment)
-    if d.upper().startswith("ECOM PUR/"):
+    if head.startswith("ECOM PUR/"):
         parts = d.split("/")
         if len(parts) >= 2:
             return parts[1].strip()
         return d
 
     # ACH-DR: extract entity name
-    if d.upper().startswith("ACH-DR-"):
+    if head.startswith("ACH-DR-"):
         remainder = d[7:]  # strip "ACH-DR-"
         # Usually: "ENTITY NAME-RefNumber"
         dash_parts = remainder.rsplit("-", 1)
@@ -337,82 +432,91 @@ def _learn_category_rule(description: str, category: str, txn_type: str = None)
     upsert_category_rule(keyword, category, source="user", txn_type=txn_type)
 
 
-def _render_transaction_row(
-    txn: dict, categories: list[str], idx: int,
-    pfx: str, email_only: Optional[bool],
+def _render_transaction_grid(
+    df: pd.DataFrame, categories: list[str],
+    pfx: str, email_only: Optional[bool], page: int = 0,
 ):
-    """Render a single transaction row with immediate-save controls."""
-    txn_id = txn["id"]
-    is_excluded = bool(txn["is_excluded"])
-    is_cc = bool(txn["is_cc_payment"])
-
-    # Anchor for scroll-back
-    st.html(f'<div id="txn-{txn_id}"></div>')
-
-    serial = idx + 1
-    source_label = "Bank" if txn["source"] == "bank" else "CC"
-    type_label = "Dr" if txn["type"] == "debit" else "Cr"
-
-    with st.container():
-        #             Info       Description  Amount  Excl  Category
-        cols = st.columns([1.2, 4.0, 1.0, 0.4, 2.2])
-
-        with cols[0]:
-            # Compact info block: S.No, ID, Date, Type in one column
-            st.caption(f"#{serial}  |  ID: {txn_id}")
-            st.write(f"{txn['date']}  {type_label}/{source_label}")
-
-        with cols[1]:
-            st.caption("Description")
-            desc = txn["description"]
-            friendly = _friendly_description(desc)
-            if is_cc:
-                st.write(f":orange[CC: {friendly}]")
-            elif is_excluded:
-                st.write(f":grey[{friendly}]")
-            else:
-                st.write(friendly)
-            if friendly != desc:
-                st.caption(desc)
-
-        with cols[2]:
-            st.caption("Amount")
-            color = "red" if txn["type"] == "debit" else "green"
-            st.write(f":{color}[₹{txn['amount']:,.2f}]")
-
-        with cols[3]:
-            st.caption("Excl.")
-            new_excluded = st.checkbox(
-                "x", value=is_excluded, key=f"{pfx}excl_{txn_id}",
-                label_visibility="collapsed",
-            )
-            if new_excluded != is_excluded:
-                update_transaction_exclusion(txn_id, new_excluded)
-                st.session_state[f"{pfx}scroll_to_txn"] = txn_id
-                st.rerun()
+    """Render all transactions as one editable grid with a Save button.
 
-        with cols[4]:
-            current_cat = txn.get("category") or ""
-            cat_options = [""] + categories
-            current_idx = cat_options.index(current_cat) if current_cat in cat_options else 0
+    A single st.data_editor replaces a row of widgets per transaction, so
+    the widget count no longer grows with the number of transactions. The
+    grid sits in a form: edits don't rerun the page, and all of them are
+    written in one batch when the form is submitted.
+    """
+    grid = pd.DataFrame({
+        "ID": df["id"],
+        "Date": df["date"],
+        "Type": np.where(df["type"] == "debit", "Dr", "Cr"),
+        "Source": np.where(df["source"] == "bank", "Bank", "CC"),
+        "Description": [
+            f"CC: {_friendly_description(d)}" if cc else _friendly_description(d)
+            for d, cc in zip(df["description"], df["is_cc_payment"])
+        ],
+        "Details": df["description"],
+        "Amount": df["amount"],
+        "Excl.": df["is_excluded"].astype(bool),
+        "Category": df["category"].astype(object).where(df["category"].notna(), None),
+    })
+    grid.index = df["id"]
+
+    # Page and version in the keys: edit state never carries over to other rows
+    grid_key = f"{pfx}txn_grid_p{page}_v{_cat_version(pfx)}"
+    with st.form(f"{grid_key}_form", border=False):
+        edited = st.data_editor(
+            grid,
+            key=grid_key,
+            hide_index=True,
+            use_container_width=True,
+            disabled=["ID", "Date", "Type", "Source", "Description", "Details", "Amount"],
+            column_config={
+                "Amount": st.column_config.NumberColumn(format="₹%.2f"),
+                "Excl.": st.column_config.CheckboxColumn(help="Excluded from totals"),
+                "Category": st.column_config.SelectboxColumn(options=categories),
+            },
+        )
+        submitted = st.form_submit_button("Save changes", type="primary")
 
-            # Versioned key: bumps after bulk updates so widgets are recreated fresh
-            new_cat = st.selectbox(
-                "Category", options=cat_options, index=current_idx,
-                key=_cat_key(pfx, txn_id), label_visibility="collapsed",
-            )
-            skip_set = st.session_state.get(f"{pfx}_skip_recat_ids", set())
-            if new_cat != current_cat and new_cat and txn_id not in skip_set:
-                update_transaction_category(txn_id, new_cat)
-                # Learn from this correction: extract merchant/payee and save as rule
-                _learn_category_rule(txn["description"], new_cat, txn.get("type"))
-                # Add to skip set so the immediate rerun from
-                # _trigger_smart_recat doesn't re-detect the change
-                skip_set.add(txn_id)
-                st.session_state[f"{pfx}_skip_recat_ids"] = skip_set
-                _trigger_smart_recat(txn, current_cat, new_cat, pfx, email_only)
+    if not submitted:
+        return
+
+    old_cat = grid["Category"].fillna("")
+    new_cat = edited["Category"].fillna("")
+    cat_changed = new_cat.ne(old_cat) & new_cat.ne("")
+    excl_changed = edited["Excl."].ne(grid["Excl."])
+    if not cat_changed.any() and not excl_changed.any():
+        return
 
-        st.divider()
+    cat_updates = {int(tid): cat for tid, cat in new_cat[cat_changed].items()}
+    types = pd.Series(df["type"].to_numpy(), index=grid.index)
+    # All writes from one Save commit together
+    with transaction():
+        bulk_update_exclusions({
+            int(tid): bool(excluded) for tid, excluded in edited.loc[excl_changed, "Excl."].items()
+        })
+        if cat_updates:
+            bulk_update_categories(cat_updates)
+            # Learn from these corrections: extract merchant/payee and save as rules
+            for txn_id, cat in cat_updates.items():
+                _learn_category_rule(grid.at[txn_id, "Details"], cat, types[txn_id])
+    st.cache_data.clear()
+    # New grid key so the applied edits aren't replayed onto fresh DB values
+    _bump_cat_version(pfx)
+
+    if cat_updates:
+        changes = [
+            (
+                {
+                    "id": txn_id,
+                    "description": grid.at[txn_id, "Details"],
+                    "type": types[txn_id],
+                    "category": grid.at[txn_id, "Category"],
+                },
+                cat,
+            )
+            for txn_id, cat in cat_updates.items()
+        ]
+        _trigger_smart_recat(changes, pfx, email_only)
+    st.rerun()
 
 
 # ---------------------------------------------------------------------------
@@ -420,49 +524,31 @@ def _render_transaction_row(
 # ---------------------------------------------------------------------------
 
 def _trigger_smart_recat(
-    txn: dict, old_category: str, new_category: str,
-    pfx: str, email_only: Optional[bool],
+    changes: list[tuple[dict, str]], pfx: str, email_only: Optional[bool],
 ):
-    """Find similar transactions; if any, queue the dialog to open."""
-    similar = find_similar_transactions(
-        txn["description"], txn["id"],
-        old_category if old_category else None,
+    """Find similar transactions for each (txn, new_category) change.
+
+    All lookups run in one query. A dialog is queued for every change with
+    matches; render() opens them one at a time.
+    """
+    similar_by_id = find_similar_transactions_batch(
+        [(txn["id"], txn["description"]) for txn, _ in changes],
         email_only=email_only,
     )
-    if similar:
-        st.session_state[f"{pfx}pending_recat"] = {
-            "source_txn": txn,
-            "old_cat": old_category or "Uncategorized",
-            "new_cat": new_category,
-            "similar": similar,
-        }
-        st.session_state[f"{pfx}scroll_to_txn"] = txn["id"]
-        st.rerun()
-    else:
-        st.session_state[f"{pfx}scroll_to_txn"] = txn["id"]
-        st.rerun()
-
-
-# ---------------------------------------------------------------------------
-# Scroll-to-anchor helper
-# ---------------------------------------------------------------------------
-
-def _inject_scroll_js(txn_id: int):
-    """Inject a small JS snippet that scrolls the page to the given transaction anchor."""
-    st.html(f"""
-        <script>
-            // Wait for the page to finish rendering, then scroll
-            const tryScroll = () => {{
-                const el = document.getElementById('txn-{txn_id}');
-                if (el) {{
-                    el.scrollIntoView({{ behavior: 'smooth', block: 'center' }});
-                }} else {{
-                    setTimeout(tryScroll, 200);
-                }}
-            }};
-            setTimeout(tryScroll, 300);
-        </script>
-    """)
+    # Rows recategorized in the same save were set explicitly -- don't offer them
+    changed_ids = {txn["id"] for txn, _ in changes}
+    queue = []
+    for txn, new_category in changes:
+        similar = [t for t in similar_by_id.get(txn["id"], []) if t["id"] not in changed_ids]
+        if similar:
+            queue.append({
+                "source_txn": txn,
+                "old_cat": txn["category"] or "Uncategorized",
+                "new_cat": new_category,
+                "similar": similar,
+            })
+    if queue:
+        st.session_state[f"{pfx}pending_recat"] = queue
 
 
 # ---------------------------------------------------------------------------
@@ -479,6 +565,9 @@ def _render_rule_management(pfx: str, categories: list[str]):
     if not rules:
         return
 
+    # Built once: each rule's selectbox index is then a dict lookup
+    cat_index = {cat: i for i, cat in enumerate(categories)}
+
     with st.expander(f"Manage Category Rules ({len(rules)} rules)"):
         for rule in rules:
             rid = rule["id"]
@@ -490,10 +579,8 @@ def _render_rule_management(pfx: str, categories: list[str]):
             with rc1:
                 st.write(f"**{rule['keyword']}**")
             with rc2:
-                cat_opts = categories
-                cur_idx = cat_opts.index(rule["category"]) if rule["category"] in cat_opts else 0
                 new_cat = st.selectbox(
-                    "cat", options=cat_opts, index=cur_idx,
+                    "cat", options=categories, index=cat_index.get(rule["category"], 0),
                     key=f"{pfx}rule_cat_{rid}", label_visibility="collapsed",
                 )
                 if new_cat != rule["category"]:
@@ -524,15 +611,25 @@ def _run_categorization(txns, categories, force_all=False):
         st.info("No transactions to categorize.")
         return
 
-    with st.spinner(f"Categorizing {len(to_categorize)} transactions..."):
-        try:
-            results = categorize_transactions(to_categorize, categories)
-            if results:
-                bulk_update_categories(results)
-                st.success(f"Categorized {len(results)} transactions.")
-            else:
-                st.warning("Categorization returned no results.")
-        except RuntimeError as e:
-            st.error(f"Categorization failed: {e}")
-        except Exception as e:
-            st.error(f"Error: {e}")
+    progress = st.progress(0.0, text=f"Categorizing {len(to_categorize)} transactions...")
+    results: dict[int, str] = {}
+    error = None
+    try:
+        for done, total, partial in categorize_transactions_chunked(to_categorize, categories):
+            results.update(partial)
+            progress.progress(done / total, text=f"Categorized {done} / {total} transactions...")
+    except RuntimeError as e:
+        error = f"Categorization failed: {e}"
+    except Exception as e:
+        error = f"Error: {e}"
+    progress.empty()
+
+    # Keep whatever finished before a failing batch
+    if results:
+        bulk_update_categories(results)
+        st.cache_data.clear()
+        st.success(f"Categorized {len(results)} transactions.")
+    if error:
+        st.error(error)
+    elif not results:
+        st.warning("Categorization returned no results.")
@@ -1,27 +1,91 @@
 """Upload Statement page – multi-file, image support, dedup, out-of-month detection."""
 
+import calendar
+import hashlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from typing import Optional
 
 from core.parser import parse_csv, parse_pdf, parse_image
 from core.database import (
-    insert_transactions,
+    insert_transactions_returning_ids,
+    flag_cc_payments_visible,
     get_all_categories,
-    get_transactions,
     get_upload_history,
-    delete_transactions_by_file,
+    delete_transactions_by_files,
     find_duplicate_transactions,
     find_within_file_duplicates,
+    transaction,
 )
 
 # Upload page only shows file-uploaded transactions (not email-synced)
 _EMAIL_ONLY = False
 from core.dedup import detect_cc_payments
-from core.categorizer import categorize_transactions
+from core.categorizer import categorize_transactions_chunked
+from views.review import pick_skipped
 
 IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp")
 
+# Upper bound on files parsed at the same time
+_PARSE_MAX_WORKERS = 8
+
+
+# Session-state key holding parse results for the current uploads. They are
+# kept out of st.cache_data because every DB write calls st.cache_data.clear(),
+# which would re-parse (and re-OCR) every file on the next rerun.
+_PARSE_CACHE_KEY = "upload_parse_cache"
+
+
+def _parse_file(file_bytes: bytes, filename: str) -> tuple[list[dict], Optional[dict]]:
+    """Parse one uploaded file; returns (transactions, column mapping or None)."""
+    ext = filename.lower()
+    if ext.endswith(IMAGE_EXTENSIONS):
+        return parse_image(file_bytes), None
+    if ext.endswith(".pdf"):
+        return parse_pdf(file_bytes), None
+    return parse_csv(file_bytes, filename)
+
+
+def _try_parse(file_bytes: bytes, filename: str):
+    """Run _parse_file on a worker thread; returns (result, None) or (None, error)."""
+    try:
+        return _parse_file(file_bytes, filename), None
+    except Exception as e:
+        return None, e
+
+
+def _parse_uploads(filenames: list[str], contents: list[bytes]) -> list[tuple]:
+    """Parse every upload, reusing this session's results for unchanged files.
+
+    Results are keyed on a hash of the contents + the file name, so changing
+    month/source or ticking a checkbox doesn't re-parse anything. New files
+    are parsed on a small thread pool; failures aren't kept, so they are
+    retried on the next rerun. Returns (result, error) pairs in upload order.
+    """
+    keys = [
+        (hashlib.sha256(data).hexdigest(), name) for name, data in zip(filenames, contents)
+    ]
+    previous = st.session_state.get(_PARSE_CACHE_KEY, {})
+    outcomes = {key: (previous[key], None) for key in keys if key in previous}
+
+    pending = {key: data for key, data in zip(keys, contents) if key not in outcomes}
+    if pending:
+        with st.spinner(f"Parsing {len(pending)} file(s)..."):
+            with ThreadPoolExecutor(max_workers=min(_PARSE_MAX_WORKERS, len(pending))) as pool:
+                parsed = pool.map(_try_parse, pending.values(), [name for _, name in pending])
+                outcomes.update(zip(pending, parsed))
+
+    # Only the current uploads are kept, so removed files free their results
+    st.session_state[_PARSE_CACHE_KEY] = {
+        key: result for key, (result, error) in outcomes.items() if error is None
+    }
+    return [outcomes[key] for key in keys]
+
 
 def render():
     st.header("Upload Statement")
@@ -39,7 +103,7 @@ def render():
             "Assign to Month",
             list(range(1, 13)),
             index=now.month - 1,
-            format_func=lambda m: datetime(2000, m, 1).strftime("%B"),
+            format_func=lambda m: calendar.month_name[m],
         )
 
     with col3:
@@ -63,37 +127,31 @@ def render():
     all_transactions = []
     file_results = []
 
-    for uploaded_file in uploaded_files:
-        file_bytes = uploaded_file.read()
-        filename = uploaded_file.name
-        ext = filename.lower()
-
-        with st.spinner(f"Parsing `{filename}`..."):
-            try:
-                if ext.endswith(IMAGE_EXTENSIONS):
-                    txns = parse_image(file_bytes)
-                    col_mapping = None
-                elif ext.endswith(".pdf"):
-                    txns = parse_pdf(file_bytes)
-                    col_mapping = None
-                else:
-                    txns, col_mapping = parse_csv(file_bytes, filename)
-            except Exception as e:
-                st.error(f"Failed to parse `{filename}`: {e}")
-                continue
+    # Results and errors are reported in upload order, from this thread
+    filenames = [uploaded_file.name for uploaded_file in uploaded_files]
+    # getvalue() hands back the upload's own bytes object (no copy) and,
+    # unlike read(), doesn't depend on the stream position
+    contents = [uploaded_file.getvalue() for uploaded_file in uploaded_files]
+    parsed = _parse_uploads(filenames, contents)
 
+    for filename, (result, error) in zip(filenames, parsed):
+        if error is not None:
+            st.error(f"Failed to parse `{filename}`: {error}")
+            continue
+
+        txns, col_mapping = result
         if not txns:
             st.warning(f"No transactions extracted from `{filename}`.")
             continue
 
-        # Tag each txn with its source file
-        for t in txns:
-            t["_source_file"] = filename
+        # Tag each txn with its source file (on copies, so the kept parse
+        # results stay as parsed)
+        txns = [{**t, "_source_file": filename} for t in txns]
 
         file_results.append({
             "filename": filename,
             "count": len(txns),
-            "col_mapping": col_mapping if not ext.endswith(IMAGE_EXTENSIONS) and not ext.endswith(".pdf") else None,
+            "col_mapping": col_mapping,
         })
         all_transactions.extend(txns)
 
@@ -111,42 +169,56 @@ def render():
                     st.write(f"**{role}**: {col if col else 'Not detected'}")
 
     # --- Detect issues BEFORE saving ---
-    out_of_month = _find_out_of_month(all_transactions, month, year)
-    within_dupes = find_within_file_duplicates(all_transactions)
-    db_dupes = find_duplicate_transactions(all_transactions, email_only=False)
+    # The database lookup runs on a worker thread while the two in-memory
+    # scans run here; sqlite3 releases the GIL while the query executes
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        db_future = pool.submit(find_duplicate_transactions, all_transactions, email_only=False)
+        out_of_month = _find_out_of_month(all_transactions, month, year)
+        within_dupes = find_within_file_duplicates(all_transactions)
+        db_dupes = db_future.result()
 
     # --- Show issues in popups ---
-    txns_to_skip = set()  # indices to exclude from saving
+    # One skip flag per parsed transaction, set by each review grid
+    skip = np.zeros(len(all_transactions), dtype=bool)
 
     if out_of_month:
-        txns_to_skip |= _show_out_of_month_dialog(all_transactions, out_of_month, month, year)
+        skip[_show_out_of_month_dialog(all_transactions, out_of_month, month, year)] = True
 
     if within_dupes:
-        txns_to_skip |= _show_within_file_dupes_dialog(all_transactions, within_dupes)
+        skip[_show_within_file_dupes_dialog(all_transactions, within_dupes)] = True
 
     if db_dupes:
-        txns_to_skip |= _show_db_dupes_dialog(db_dupes)
+        skip[_show_db_dupes_dialog(db_dupes)] = True
 
     # --- Filter out skipped transactions ---
-    filtered_txns = [t for i, t in enumerate(all_transactions) if i not in txns_to_skip]
+    filtered_txns = list(itertools.compress(all_transactions, ~skip))
 
     # --- Preview ---
     st.subheader(f"Preview: {len(filtered_txns)} transaction(s) to save")
-    if txns_to_skip:
-        st.caption(f"{len(txns_to_skip)} transaction(s) will be skipped (out-of-month or duplicates)")
-
-    preview_df = pd.DataFrame([
-        {"date": t["date"], "description": t["description"][:60],
-         "amount": t["amount"], "type": t["type"], "file": t["_source_file"]}
-        for t in filtered_txns
-    ])
+    skipped = int(skip.sum())
+    if skipped:
+        st.caption(f"{skipped} transaction(s) will be skipped (out-of-month or duplicates)")
+
+    # Built column by column so no per-row dict is created for the preview
+    preview_df = pd.DataFrame({
+        "date": [t["date"] for t in filtered_txns],
+        "description": [t["description"][:60] for t in filtered_txns],
+        "amount": [t["amount"] for t in filtered_txns],
+        "type": [t["type"] for t in filtered_txns],
+        "file": [t["_source_file"] for t in filtered_txns],
+    })
     if not preview_df.empty:
         preview_df.index = range(1, len(preview_df) + 1)
-        st.dataframe(preview_df, use_container_width=True, height=300)
+        st.dataframe(
+            preview_df, use_container_width=True, height=300,
+            column_config={"amount": st.column_config.NumberColumn(format="₹%.2f")},
+        )
 
     # --- Summary ---
-    total_debits = sum(t["amount"] for t in filtered_txns if t["type"] == "debit")
-    total_credits = sum(t["amount"] for t in filtered_txns if t["type"] == "credit")
+    # One grouped sum over the preview frame gives both totals
+    totals = preview_df.groupby("type")["amount"].sum()
+    total_debits = totals.get("debit", 0.0)
+    total_credits = totals.get("credit", 0.0)
 
     m1, m2, m3 = st.columns(3)
     m1.metric("Total Debits", f"₹{total_debits:,.2f}")
@@ -168,38 +240,32 @@ def render():
 
 def _find_out_of_month(txns: list[dict], month: int, year: int) -> list[int]:
     """Return indices of transactions whose date falls outside the selected month."""
-    out = []
-    for i, t in enumerate(txns):
-        try:
-            d = datetime.strptime(t["date"], "%Y-%m-%d")
-            if d.month != month or d.year != year:
-                out.append(i)
-        except (ValueError, TypeError):
-            pass
-    return out
+    # Statements repeat the same few dates, so let to_datetime reuse parses;
+    # unparseable dates become NaT and are left alone, as before
+    dates = pd.to_datetime(
+        pd.Series([t.get("date") for t in txns], dtype=object),
+        format="%Y-%m-%d", errors="coerce", cache=True,
+    )
+    outside = dates.notna() & ((dates.dt.month != month) | (dates.dt.year != year))
+    return np.flatnonzero(outside.to_numpy()).tolist()
 
 
 def _show_out_of_month_dialog(txns, indices, month, year):
     """Show out-of-month transactions and let user decide to skip them."""
-    month_name = datetime(year, month, 1).strftime("%B %Y")
-    skip_set = set()
+    month_name = f"{calendar.month_name[month]} {year}"
 
     with st.expander(f"⚠️ {len(indices)} transaction(s) are outside {month_name}", expanded=True):
         st.warning(
             f"The following transactions have dates outside **{month_name}**. "
-            f"Uncheck any you want to **exclude** from this upload."
+            f"Untick Skip for any you want to **include** in this upload."
         )
-        for idx in indices:
-            t = txns[idx]
-            keep = st.checkbox(
-                f"{t['date']} | {t['description'][:50]} | ₹{t['amount']:,.2f}",
-                value=False,
-                key=f"oom_{idx}",
-            )
-            if not keep:
-                skip_set.add(idx)
-
-    return skip_set
+        flagged = [txns[idx] for idx in indices]
+        return pick_skipped(indices, {
+            "Date": [t["date"] for t in flagged],
+            "Description": [t["description"][:50] for t in flagged],
+            "Amount": [t["amount"] for t in flagged],
+            "File": [t["_source_file"] for t in flagged],
+        }, key="upload_oom")
 
 
 # ---------------------------------------------------------------------------
@@ -208,24 +274,19 @@ def _show_out_of_month_dialog(txns, indices, month, year):
 
 def _show_within_file_dupes_dialog(txns, dupe_pairs):
     """Show within-file duplicates and let user exclude the second occurrence."""
-    skip_set = set()
-
     with st.expander(f"⚠️ {len(dupe_pairs)} duplicate(s) found within the file(s)", expanded=True):
         st.warning(
             "The following transactions appear more than once in the uploaded file(s). "
             "The duplicate (second occurrence) will be skipped by default."
         )
-        for idx_a, idx_b in dupe_pairs:
-            t = txns[idx_b]
-            keep = st.checkbox(
-                f"Duplicate: {t['date']} | {t['description'][:50]} | ₹{t['amount']:,.2f}",
-                value=False,
-                key=f"wfd_{idx_b}",
-            )
-            if not keep:
-                skip_set.add(idx_b)
-
-    return skip_set
+        indices = [idx_b for _, idx_b in dupe_pairs]
+        flagged = [txns[idx] for idx in indices]
+        return pick_skipped(indices, {
+            "Date": [t["date"] for t in flagged],
+            "Description": [t["description"][:50] for t in flagged],
+            "Amount": [t["amount"] for t in flagged],
+            "File": [t["_source_file"] for t in flagged],
+        }, key="upload_wfd")
 
 
 # ---------------------------------------------------------------------------
@@ -234,25 +295,19 @@ def _show_within_file_dupes_dialog(txns, dupe_pairs):
 
 def _show_db_dupes_dialog(db_dupes):
     """Show transactions that already exist in the database."""
-    skip_set = set()
-
     with st.expander(f"⚠️ {len(db_dupes)} transaction(s) already exist in database", expanded=True):
         st.warning(
             "These transactions match existing records (same date, amount, and similar description). "
             "They will be skipped by default to avoid double-counting."
         )
-        for d in db_dupes:
-            t = d["new_txn"]
-            keep = st.checkbox(
-                f"{t['date']} | {t['description'][:45]} | ₹{t['amount']:,.2f} "
-                f"(matches: {d['existing_desc'][:30]}... from {d['existing_file']})",
-                value=False,
-                key=f"dbd_{d['new_idx']}",
-            )
-            if not keep:
-                skip_set.add(d["new_idx"])
-
-    return skip_set
+        flagged = [d["new_txn"] for d in db_dupes]
+        return pick_skipped([d["new_idx"] for d in db_dupes], {
+            "Date": [t["date"] for t in flagged],
+            "Description": [t["description"][:45] for t in flagged],
+            "Amount": [t["amount"] for t in flagged],
+            "Matches": [d["existing_desc"][:30] for d in db_dupes],
+            "From": [d["existing_file"] for d in db_dupes],
+        }, key="upload_dbd")
 
 
 # ---------------------------------------------------------------------------
@@ -261,96 +316,135 @@ def _show_db_dupes_dialog(db_dupes):
 
 def _save_and_categorize(transactions, source_key, month, year):
     """Save transactions to DB, run dedup, and run LLM categorization."""
-    # Group by source file for proper uploaded_file tagging
-    rows = []
-    for t in transactions:
-        rows.append({
+    # Columns shared by every row are built once and merged into each one
+    common = {
+        "source": source_key,
+        "category": None,
+        "is_cc_payment": 0,
+        "is_excluded": 0,
+        "month": month,
+        "year": year,
+    }
+    rows = [
+        {
+            **common,
             "date": t["date"],
             "description": t["description"],
             "amount": t["amount"],
             "type": t["type"],
-            "source": source_key,
-            "category": None,
-            "is_cc_payment": 0,
-            "is_excluded": 0,
-            "month": month,
-            "year": year,
             "uploaded_file": t.get("_source_file", "unknown"),
-        })
-
-    with st.spinner("Saving transactions..."):
-        count = insert_transactions(rows)
-
-    st.success(f"Saved **{count}** transactions.")
-
-    # --- CC payment deduplication (bank statements only) ---
-    if source_key == "bank":
-        with st.spinner("Checking for credit card payment duplicates..."):
-            saved_txns = get_transactions(month=month, year=year, source="bank", include_excluded=True)
-            flagged_ids = detect_cc_payments(saved_txns)
-
-            if flagged_ids:
-                from core.database import flag_cc_payments_visible
-                flag_cc_payments_visible(flagged_ids)
-                st.warning(
-                    f"Flagged **{len(flagged_ids)}** transaction(s) as likely credit card payments "
-                    f"(excluded from totals but still visible)."
-                )
+        }
+        for t in transactions
+    ]
+
+    # Insert and CC flagging commit together
+    with st.spinner("Saving transactions..."), transaction():
+        ids = insert_transactions_returning_ids(rows)
+
+        # Keep the saved rows in memory so the follow-up steps don't re-read the month
+        saved_txns = [{**row, "id": txn_id} for row, txn_id in zip(rows, ids)]
+
+        # --- CC payment deduplication (bank statements only) ---
+        flagged_ids = detect_cc_payments(saved_txns) if source_key == "bank" else []
+        if flagged_ids:
+            flag_cc_payments_visible(flagged_ids)
+    st.cache_data.clear()
+
+    st.success(f"Saved **{len(saved_txns)}** transactions.")
+
+    if flagged_ids:
+        flagged = set(flagged_ids)
+        for t in saved_txns:
+            if t["id"] in flagged:
+                t["is_cc_payment"] = 1
+                t["is_excluded"] = 1
+                t["category"] = "Credit Card Payment"
+        st.warning(
+            f"Flagged **{len(flagged_ids)}** transaction(s) as likely credit card payments "
+            f"(excluded from totals but still visible)."
+        )
 
     # --- LLM Categorization via Ollama ---
-    with st.spinner("Categorizing with Ollama... This may take a moment."):
-        try:
-            saved_txns = get_transactions(month=month, year=year)
-            uncategorized = [t for t in saved_txns if not t.get("category")]
-
-            if uncategorized:
-                categories = get_all_categories()
-                results = categorize_transactions(uncategorized, categories)
-
-                if results:
-                    from core.database import bulk_update_categories
-                    bulk_update_categories(results)
-                    st.success(
-                        f"Auto-categorized **{len(results)}** / {len(uncategorized)} transactions."
-                    )
-                else:
-                    st.info("Categorization returned no results. Categorize manually in Transactions page.")
-            else:
-                st.info("All transactions already have categories.")
-        except RuntimeError as e:
-            st.warning(f"Categorization skipped: {e}")
-        except Exception as e:
-            st.warning(f"Categorization issue: {e}")
+    uncategorized = [
+        t for t in saved_txns if not t["is_excluded"] and not t.get("category")
+    ]
+    if not uncategorized:
+        st.info("All transactions already have categories.")
+        return
+
+    progress = st.progress(0.0, text="Categorizing with Ollama... This may take a moment.")
+    results: dict[int, str] = {}
+    issue = None
+    try:
+        categories = get_all_categories()
+        for done, total, partial in categorize_transactions_chunked(uncategorized, categories):
+            results.update(partial)
+            progress.progress(done / total, text=f"Categorized {done} / {total} transactions...")
+    except RuntimeError as e:
+        issue = f"Categorization skipped: {e}"
+    except Exception as e:
+        issue = f"Categorization issue: {e}"
+    progress.empty()
+
+    # Keep whatever finished before a failing batch
+    if results:
+        from core.database import bulk_update_categories
+        bulk_update_categories(results)
+        st.cache_data.clear()
+        st.success(
+            f"Auto-categorized **{len(results)}** / {len(uncategorized)} transactions."
+        )
+    if issue:
+        st.warning(issue)
+    elif not results:
+        st.info("Categorization returned no results. Categorize manually in Transactions page.")
 
 
 # ---------------------------------------------------------------------------
 # Upload history
 # ---------------------------------------------------------------------------
 
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_upload_history() -> list[dict]:
+    # Every write on this page is followed by st.cache_data.clear()
+    return get_upload_history(email_only=_EMAIL_ONLY)
+
+
 def _render_upload_history():
-    """Show past uploads with option to delete."""
-    history = get_upload_history(email_only=_EMAIL_ONLY)
+    """Show past uploads; files ticked for deletion are removed together."""
+    history = _cached_upload_history()
     if not history:
         return
 
     st.subheader("Upload History")
 
-    for h in history:
-        month_label = datetime(h["year"], h["month"], 1).strftime("%B %Y")
-        source_label = "Bank" if h["source"] == "bank" else "Credit Card"
-
-        col1, col2, col3, col4, col5 = st.columns([3, 1.5, 1, 1.5, 1])
-        with col1:
-            st.write(f"**{h['uploaded_file']}**")
-        with col2:
-            st.write(f"{month_label} / {source_label}")
-        with col3:
-            st.write(f"{h['txn_count']} txns")
-        with col4:
-            uploaded_at = h["uploaded_at"][:16] if h["uploaded_at"] else "—"
-            st.caption(uploaded_at)
-        with col5:
-            if st.button("Delete", key=f"del_{h['uploaded_file']}_{h['month']}_{h['year']}"):
-                deleted = delete_transactions_by_file(h["uploaded_file"])
-                st.success(f"Deleted {deleted} transaction(s) from `{h['uploaded_file']}`")
-                st.rerun()
+    grid = pd.DataFrame({
+        "Delete": False,
+        "File": [h["uploaded_file"] for h in history],
+        "Month": [f"{calendar.month_name[h['month']]} {h['year']}" for h in history],
+        "Source": ["Bank" if h["source"] == "bank" else "Credit Card" for h in history],
+        "Txns": [h["txn_count"] for h in history],
+        "Uploaded": [h["uploaded_at"][:16] if h["uploaded_at"] else "—" for h in history],
+    })
+    edited = st.data_editor(
+        grid,
+        key="upload_history",
+        hide_index=True,
+        use_container_width=True,
+        num_rows="fixed",
+        disabled=[c for c in grid.columns if c != "Delete"],
+        column_config={
+            "Delete": st.column_config.CheckboxColumn(help="Tick files to delete, then press Delete selected"),
+        },
+    )
+
+    # A file can span several months; deleting it removes all of them
+    selected = list(dict.fromkeys(edited.loc[edited["Delete"], "File"]))
+    if st.button(
+        f"Delete selected ({len(selected)})", disabled=not selected, key="upload_history_delete",
+    ):
+        deleted = delete_transactions_by_files(selected)
+        st.cache_data.clear()
+        st.session_state.pop("upload_history", None)
+        st.success(f"Deleted {deleted} transaction(s) from {len(selected)} file(s)")
+        st.rerun()